@@ -1,16 +1,22 @@
 ##################################################
 # 0. Imports
 ##################################################
+#
+# Importing this module is cheap: only the standard library is loaded
+# here. pandas and the pipeline helpers are imported, and files are read,
+# only when run_sales_aggregation() is called, so schedulers and
+# ui_app.py can load it as a library, e.g.
+#
+#   agg = importlib.import_module("1_Sales_Data_Aggregation")
+#   output_file, df_final = agg.run_sales_aggregation(stores=[1, 4])
 
 import os
 import csv
-import pandas as pd
-from datetime import datetime, timedelta
-from pandas import json_normalize
+from datetime import date, datetime
 
 
 ##################################################
-# 1. Paths (MATCH YOUR FOLDER)
+# 1. Default paths and settings (MATCH YOUR FOLDER)
 ##################################################
 
 BASE_DIR = os.getcwd()
@@ -18,138 +24,202 @@ BASE_DIR = os.getcwd()
 DATA_DIR = os.path.join(BASE_DIR, "Data Files")
 OUTPUT_DIR = os.path.join(BASE_DIR, "aggregated_sales_data")
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-products_d_loc = os.path.join(DATA_DIR, "products.csv")
-stores_d_loc = os.path.join(DATA_DIR, "stores.csv")
-processed_time_d_loc = os.path.join(DATA_DIR, "processed_time_df.csv")
-
-sales_file = os.path.join(
-    DATA_DIR, "sales_store1_2019_01_02_00_00_00.json"
-)
-
-price_file = os.path.join(
-    DATA_DIR, "pc_store1_2019_04_02_00_00_00.json"
-)
-
-
-##################################################
-# 2. Read processed time
-##################################################
-
-with open(processed_time_d_loc) as f:
-    reader = csv.reader(f)
-    rows = list(reader)
-
-start_date = datetime.strptime(rows[1][0], "%Y-%m-%d").date()
-end_date = datetime.strptime(rows[1][1], "%Y-%m-%d").date()
-
-
-##################################################
-# 3. Read products & stores
-##################################################
-
-df_products = pd.read_csv(products_d_loc)
-df_stores = pd.read_csv(stores_d_loc)
-
-df_products["ProductID"] = df_products["ProductID"].astype("category")
-df_stores["StoreID"] = df_stores["StoreID"].astype("category")
-
-
-##################################################
-# 4. Read SALES JSON
-##################################################
-
-df_raw = pd.read_json(sales_file)
-
-transactions = json_normalize(df_raw["Transactions"])
-df_raw = df_raw.drop("Transactions", axis=1).join(transactions)
-
-df_raw["TransactionDateTime"] = pd.to_datetime(df_raw["TransactionDateTime"])
-
-sales_rows = []
-
-for _, row in df_raw.iterrows():
-    products = json_normalize(row["Products"])
-    products["store_id"] = row["StoreID"]
-    products["date_date"] = row["TransactionDateTime"]
-    sales_rows.append(products)
-
-df_sales = pd.concat(sales_rows, ignore_index=True)
-
-df_sales = df_sales.rename(columns={"ProductID": "product_id"})
-df_sales["product_id"] = df_sales["product_id"].astype("category")
-df_sales["store_id"] = df_sales["store_id"].astype("category")
-
+SALES_FILE_NAME = "sales_store1_2019_01_02_00_00_00.json"
+PRICE_FILE_NAME = "pc_store1_2019_04_02_00_00_00.json"
+
+## how sales logs are read
+##   "stream"   -- the single SALES_FILE_NAME log, one transaction at a time;
+##                 peak memory depends on the number of (week, store, product) keys only
+##   "flatten"  -- the single log loaded whole and flattened column-wise
+##   "all_logs" -- every sales_storeN_*.json / pc_storeN_*.json in the data dir
+##                 that falls in the processed window, counted in a process
+##                 pool of MAX_WORKERS (None = one per core)
+##   "chunked"  -- the same logs in one process, aggregated in batches of
+##                 CHUNK_ROWS sold items; partial aggregates above
+##                 MEMORY_LIMIT_MB are spilled to disk and merged per hash bucket
+MODE = "stream"
+MAX_WORKERS = None
+CHUNK_ROWS = 500_000
+MEMORY_LIMIT_MB = None
+
+## incremental mode (implies "all_logs"): logs already folded into the
+## running counts in STATE_DIR are skipped, only new ones are parsed
+INCREMENTAL = False
+STATE_DIR = os.path.join(BASE_DIR, "aggregation_state")
+
+## also write the result to the partitioned Parquet store read by the trainer,
+## the optimizer and the dashboard (needs pyarrow)
+WRITE_SALES_STORE = False
+SALES_STORE_DIR = os.path.join(BASE_DIR, "sales_store")
+
+
+def read_processed_window(processed_time_d_loc):
+    """(start_date, end_date) from processed_time_df.csv."""
+    with open(processed_time_d_loc) as f:
+        rows = list(csv.reader(f))
+    start_date = datetime.strptime(rows[1][0], "%Y-%m-%d").date()
+    end_date = datetime.strptime(rows[1][1], "%Y-%m-%d").date()
+    return start_date, end_date
+
+
+def run_sales_aggregation(data_dir=DATA_DIR, output_dir=OUTPUT_DIR, start_date=None, end_date=None,
+                          stores=None, mode=MODE, incremental=INCREMENTAL, max_workers=MAX_WORKERS,
+                          chunk_rows=CHUNK_ROWS, memory_limit_mb=MEMORY_LIMIT_MB, spill_dir=None, n_buckets=16,
+                          sales_file=None, price_file=None, state_dir=STATE_DIR,
+                          write_sales_store=WRITE_SALES_STORE, sales_store_dir=SALES_STORE_DIR):
+    """Aggregate sales logs to weekly (store, product) sales and export them.
+
+    start_date / end_date default to the window in processed_time_df.csv;
+    stores restricts the output to those store ids. Writes
+    week_start_<start_date>.csv (plus the price timeline and dimension
+    dictionary) to output_dir and returns (output_file, df_final).
+    """
+    from aggregation_state import AggregationState
+    from chunked_aggregation import ChunkedWeeklyAggregator
+    from dimensions import load_dimensions
+    from price_timeline import PriceTimeline
+    from sales_logs import (
+        WeeklySalesCounter, count_sales_logs, discover_logs, flatten_sales_log,
+        iter_sales_log, read_price_log, read_price_logs, week_starts
+    )
 
-##################################################
-# 5. Weekly aggregation
-##################################################
+    os.makedirs(output_dir, exist_ok=True)
+    sales_file = sales_file or os.path.join(data_dir, SALES_FILE_NAME)
+    price_file = price_file or os.path.join(data_dir, PRICE_FILE_NAME)
+    if incremental:
+        mode = "all_logs"
 
-df_sales["week_start"] = df_sales["date_date"].dt.date
+    ##################################################
+    # 2. Read processed time
+    ##################################################
 
-df_sales = (
-    df_sales.groupby(["week_start", "store_id", "product_id"])
-    .size()
-    .reset_index(name="sales")
-)
+    if start_date is None or end_date is None:
+        window = read_processed_window(os.path.join(data_dir, "processed_time_df.csv"))
+        start_date = start_date or window[0]
+        end_date = end_date or window[1]
 
 
-##################################################
-# 6. Read PRICE CHANGE JSON
-##################################################
+    ##################################################
+    # 3. Read products & stores
+    ##################################################
 
-df_price = pd.read_json(price_file)
+    ## product/store dimension dictionary (int32 codes + attribute arrays) shared by all stages
+    dims = load_dimensions(
+        os.path.join(output_dir, "dimensions.npz"),
+        os.path.join(data_dir, "products.csv"),
+        os.path.join(data_dir, "stores.csv"),
+    )
 
-price_updates = json_normalize(df_price["PriceUpdates"])
-df_price = df_price.drop("PriceUpdates", axis=1).join(price_updates)
 
-df_price["week_start"] = pd.to_datetime(df_price["PriceDate"]).dt.date
+    ##################################################
+    # 4. Read SALES JSON
+    ##################################################
+
+    if incremental:
+        state = AggregationState.load(state_dir, start_date)
+        new_logs = state.pending(discover_logs(data_dir, "sales", start_date, end_date))
+        if new_logs:
+            partial = count_sales_logs([path for path, _, _ in new_logs], start_date, max_workers)
+            state.fold(partial.counts, new_logs)
+            state.save()
+        df_sales = state.to_frame(start_date, end_date)
+    elif mode == "all_logs":
+        sales_files = [
+            path for path, _, _ in discover_logs(data_dir, "sales", start_date, end_date, stores)
+        ]
+        df_sales = count_sales_logs(sales_files, start_date, max_workers).to_frame()
+    elif mode == "chunked":
+        aggregator = ChunkedWeeklyAggregator(start_date, chunk_rows, memory_limit_mb, spill_dir, n_buckets)
+        for path, _, _ in discover_logs(data_dir, "sales", start_date, end_date, stores):
+            aggregator.add_rows(iter_sales_log(path))
+        df_sales = aggregator.result()
+    elif mode == "stream":
+        counter = WeeklySalesCounter(start_date)
+        counter.update(iter_sales_log(sales_file))
+        df_sales = counter.to_frame()
+    elif mode == "flatten":
+        df_sales = flatten_sales_log(sales_file)
+        df_sales["store_id"] = df_sales["store_id"].astype("category")
+    else:
+        raise ValueError(f"unknown aggregation mode {mode!r}")
+
+
+    ##################################################
+    # 5. Weekly aggregation
+    ##################################################
+
+    if mode == "flatten":
+        df_sales["week_start"] = week_starts(df_sales["date_date"], start_date)
+
+        df_sales = (
+            df_sales.groupby(["week_start", "store_id", "product_id"], observed=True)
+            .size()
+            .reset_index(name="sales")
+        )
+
+    if stores is not None:
+        df_sales = df_sales[df_sales["store_id"].isin(stores)].reset_index(drop=True)
+
+
+    ##################################################
+    # 6. Read PRICE CHANGE JSON
+    ##################################################
+
+    ## price-change logs are small and re-read in full on every run; changes
+    ## before the window are kept because they set the price in effect at its start
+    if mode in ("all_logs", "chunked"):
+        price_files = [
+            path for path, _, _ in discover_logs(data_dir, "pc", date.min, end_date, stores)
+        ]
+        df_price = read_price_logs(price_files)
+    else:
+        df_price = read_price_log(price_file)
+
+
+    ##################################################
+    # 7. Merge everything
+    ##################################################
+
+    ## price in effect at the start of each sales week (as-of join, not an exact
+    ## date match: price-change dates rarely coincide with a week start);
+    ## the timeline is saved for reuse by the optimizer
+    price_timeline = PriceTimeline.from_price_changes(df_price)
+    price_timeline.save(os.path.join(output_dir, "price_timeline.npz"))
+
+    df_final = df_sales.copy()
+    df_final["price"], df_final["PriceDate"] = price_timeline.asof(
+        df_final["store_id"], df_final["product_id"], df_final["week_start"]
+    )
+    df_final = df_final[["week_start", "store_id", "product_id", "sales", "PriceDate", "price"]]
 
-df_price = df_price.rename(
-    columns={
-        "ProductID": "product_id",
-        "StoreID": "store_id",
-        "Price": "price",
-    }
-)
+    ## product and store attributes by code lookup instead of two string-keyed merges
+    df_final = dims.attach(df_final)
 
 
-##################################################
-# 7. Merge everything
-##################################################
+    ##################################################
+    # 8. Export
+    ##################################################
 
-df_final = df_sales.merge(
-    df_price,
-    on=["week_start", "store_id", "product_id"],
-    how="left"
-)
-
-df_final = df_final.merge(
-    df_products, left_on="product_id", right_on="ProductID", how="left"
-)
+    output_file = os.path.join(
+        output_dir, f"week_start_{start_date}.csv"
+    )
 
-df_final = df_final.merge(
-    df_stores, left_on="store_id", right_on="StoreID", how="left"
-)
+    df_final.to_csv(output_file, index=False)
 
+    if write_sales_store:
+        from sales_store import write_sales
+        write_sales(df_final, sales_store_dir)
 
-##################################################
-# 8. Export
-##################################################
+    return output_file, df_final
 
-output_file = os.path.join(
-    OUTPUT_DIR, f"week_start_{start_date}.csv"
-)
 
-df_final.to_csv(output_file, index=False)
+## pool workers re-import this module on spawn-based platforms, so the
+## pipeline only runs when it is executed as a script
+if __name__ == "__main__":
+    output_file, df_final = run_sales_aggregation()
 
-print("✅ Sales data aggregation completed successfully")
-print("📁 File created:", output_file)
-print("📊 Rows:", df_final.shape[0])
-def run_sales_aggregation():
-    output_file = os.path.join(
-        OUTPUT_DIR, f"week_start_{start_date}.csv"
-    )
-    df_final.to_csv(output_file, index=False)
-    return output_file, df_final
+    print("✅ Sales data aggregation completed successfully")
+    print("📁 File created:", output_file)
+    if WRITE_SALES_STORE:
+        print("🗂️ Sales store updated:", SALES_STORE_DIR)
+    print("📊 Rows:", df_final.shape[0])
@@ -1,57 +1,100 @@
 ################################################## 0: import libraries and define functions
+import os
 import csv
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from sklearn.ensemble import RandomForestRegressor
 from sklearn import metrics
-from sklearn.externals import joblib
+import joblib
+from append_log import append_csv_row, last_csv_row
+from dimensions import Dimensions
+from feature_store import FeatureStore
+from incremental_forest import drift_vs_full_refit, grow_forest, recent_weeks
+from model_registry import ModelRegistry
+from model_validation import PARAM_GRID, best_params, walk_forward_search
+from run_metrics import RunMetrics, frame_bytes
+from sales_store import list_partitions, read_sales
 
 ################################################## 1: define paths of input files and output files
 ## input files
 df_sales_loc = "D:/samarth/Desktop/PriceOp/Project/aggregated_sales_data/"
+## partitioned Parquet store written by 1_Sales_Data_Aggregation.py; preferred over df_sales.csv when present
+sales_store_loc = "D:/samarth/Desktop/PriceOp/Project/sales_store/"
+## product/store dimension dictionary written by 1_Sales_Data_Aggregation.py
+dimensions_loc = "D:/samarth/Desktop/PriceOp/Project/aggregated_sales_data/dimensions.npz"
 processed_time_d_loc = "D:/samarth/Desktop/PriceOp/Project/publicparameters/processed_time_df.csv"
 ## output files
-df_train_loc = "D:/samarth/Desktop/PriceOp/Project/train_data/"
+## rl_price/discount training features, one file per week, shared with the optimizer
+feature_store_loc = "D:/samarth/Desktop/PriceOp/Project/train_data/feature_store/"
 modelDir = "D:/samarth/Desktop/PriceOp/Project/Models/"
 df_model_performance_loc="D:/samarth/Desktop/PriceOp/Project/model_performance_data/"
 
-## test whether the model exists or not
-try:
-    dirfilename = pd.read_csv(modelDir+'model_name.csv')
-    model_exist = True
-except:
-    model_exist = False
+## the first run (no model yet) fits the whole forest; later runs retrain it:
+##   "incremental" -- grow the previous model (latest registered model) with
+##                    trees fitted on the recent weeks only; retrain cost stays flat
+##   "full"        -- refit the whole forest on the entire history
+## an incremental retrain without new weeks keeps the previous model ("unchanged")
+TRAIN_MODE = "incremental"
+## compare incremental retraining against a full refit (on a bounded sample of the history),
+## both fitted without the latest week and scored on it
+REPORT_DRIFT = True
+
+## walk-forward validation: every PARAM_GRID candidate is scored out of sample on
+## time-ordered folds in a process pool (all cores); the best one is used for full fits.
+## Incremental retrains skip the search, so their cost stays flat.
+## Per-fold metrics and timings go to df_model_validation.csv next to df_model_performance.csv
+VALIDATE = True
+VALIDATION_TIME_BUDGET_S = 3600
+
+## the validation pool re-imports this script on spawn-based platforms (Windows),
+## so the pipeline only runs when it is executed as a script
+if __name__ == "__main__":
+    ## test whether the model exists or not: the latest registered model, or the last
+    ## model_name.csv entry for models saved before the registry; none means first run
+    model_registry = ModelRegistry(modelDir)
+    if model_registry.latest() is not None:
+        previous_model_file = model_registry.path()
+    else:
+        previous_model_file = (last_csv_row(modelDir+'model_name.csv') or {}).get('model_name')
+    model_exist = previous_model_file is not None
+    print("Retraining from " + previous_model_file if model_exist else "First run: training a new model")
+
+    ## wall/CPU time, peak RSS and data volumes per step, one JSON record per run
+    ## appended to training_runs.jsonl next to df_model_performance.csv
+    run = RunMetrics(os.path.basename(__file__))
 
-## if model_exist, means the pipeline for the first has finished, means the training data are ready for retraining
-if model_exist:
     ################################################## 2: read into aggregated sales data
-    df_sales = pd.read_csv(df_sales_loc+'df_sales.csv')
+    run.start("read_sales")
+    feature_store = FeatureStore(feature_store_loc)
+    if os.path.isdir(sales_store_loc):
+        ## only weeks without stored features and only the fact columns are decoded;
+        ## product/store attributes are gathered by dimension code
+        weeks = feature_store.pending_weeks(sorted({week for week, _ in list_partitions(sales_store_loc)}))
+        df_sales = read_sales(sales_store_loc, weeks=weeks,
+                              columns=["week_start", "store_id", "product_id", "sales", "price"])
+        df_sales = Dimensions.load(dimensions_loc).attach(
+            df_sales, attrs=["DepartmentID", "BrandID", "MSRP", "AvgHouseholdIncome", "AvgTraffic"])
+    else:
+        df_sales = pd.read_csv(df_sales_loc+'df_sales.csv')
     df_sales = df_sales.fillna(0)
-    df_sales = df_sales.drop(["StoreID", "ProductID"], axis=1)
+    df_sales = df_sales.drop(["StoreID", "ProductID"], axis=1, errors="ignore")
     df_sales = df_sales.rename(columns={'DepartmentID':'department_id', 'BrandID':'brand_id'})
-    ## get the time the model is built
-    model_time = df_sales['week_start'].max()
+    run.stop(rows_out=len(df_sales), bytes_out=frame_bytes(df_sales))
 
     ################################################## 3: feature engineering: build the features
-    ## calculate relative price and discount for train data
-    competing_group = ['week_start', 'store_id', 'department_id']
-    df_train_price_sum = df_sales.groupby(competing_group).agg("sum")['price'].to_frame().reset_index(drop=False)
-    df_train_price_sum = df_train_price_sum.rename(columns={'price':'price_sum'})
-
-    df_train_price_count = df_sales.groupby(competing_group).agg("count")['price'].to_frame().reset_index(drop=False)
-    df_train_price_count = df_train_price_count.rename(columns={'price':'count'})
-
-    df_train = pd.merge(df_sales, df_train_price_sum, on=competing_group)
-    df_train = pd.merge(df_train, df_train_price_count, on=competing_group)
-
-    df_train['rl_price'] = df_train['price'] * df_train['count'] /  df_train['price_sum']
-    df_train['discount'] = df_train['MSRP'] - df_train['price'] / df_train['MSRP']
+    ## relative price and discount are computed once per new week in one grouped pass
+    ## and kept in the feature store; earlier weeks are read back instead of recomputed
+    run.start("features", rows_in=len(df_sales), bytes_in=frame_bytes(df_sales))
+    feature_store.update(df_sales)
+    df_train = feature_store.read()
+    run.stop(rows_out=len(df_train), bytes_out=frame_bytes(df_train))
+    ## get the time the model is built
+    model_time = df_train['week_start'].max()
 
-    df_train = df_train.drop(["price_sum", "count"], axis=1)
-    
     ################################################## 4: prepare the train data for modeling
     ## define categorical features, numerical features as well as label, which used in modeling
+    run.start("prepare", rows_in=len(df_train), bytes_in=frame_bytes(df_train))
     features_categorical_train = ["department_id", "brand_id"]
     features_numerical_train = ["price", "AvgHouseholdIncome", "AvgTraffic", "rl_price", "discount"]
     label_train = ["sales"]
@@ -65,30 +108,84 @@ if model_exist:
 
     X = df_train_modeling.iloc[:,1:].values  
     y = df_train_modeling.iloc[:,0].values
+    run.stop(rows_out=len(X), bytes_out=frame_bytes(X) + frame_bytes(y))
+
+    ## the previous model, with the last week it was trained on (unknown for models built before
+    ## incremental retraining, which are then refitted in full once)
+    previous_model = joblib.load(previous_model_file) if model_exist else None
+    trained_until = getattr(previous_model, 'trained_until_', None)
+    train_mode = "incremental" if TRAIN_MODE == "incremental" and trained_until is not None else "full"
+    ## no week newer than the previous model (a rerun in the same cycle): keep it as it is, growing it
+    ## again on the same weeks would only age out its older trees
+    if train_mode == "incremental" and not (df_train['week_start'].astype(str) > str(trained_until)).any():
+        train_mode = "unchanged"
 
-    ################################################## 5: train random forest regression model
+    ################################################## 5: walk-forward validation and parameter search
+    ## only full fits use the searched parameters: incremental retrains grow the previous forest with
+    ## its depth and keep the parameters of the last full fit (the drift reference below)
+    rf_params = {'n_estimators': 100, 'max_depth': 10}
+    df_cv_summary = pd.DataFrame()
+    if train_mode in ("incremental", "unchanged"):
+        previous_metrics = (model_registry.entry().get('metrics') or {}) if model_registry.latest() is not None else {}
+        rf_params = {'n_estimators': int(previous_metrics.get('n_estimators') or previous_model.n_estimators),
+                     'max_depth': previous_model.max_depth}
+    elif VALIDATE:
+        run.start("validate", rows_in=len(X), bytes_in=frame_bytes(X))
+        df_folds, df_cv_summary = walk_forward_search(
+            X, y, df_train['week_start'].values, PARAM_GRID, time_budget_s=VALIDATION_TIME_BUDGET_S)
+        rf_params = best_params(df_cv_summary, rf_params)
+        df_folds = df_folds.assign(model_time=model_time)
+        for record in df_folds.to_dict('records'):
+            append_csv_row(df_model_performance_loc+'df_model_validation.csv', record)
+        run.stop(rows_out=len(df_folds), bytes_out=frame_bytes(df_folds))
+
+    ################################################## 6: train random forest regression model
     ## random forest
-    ## train model
-    rfModel = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=0)
-    # Predict on train data
-    rfModel.fit(X, y)
+    run.start("fit", rows_in=len(X), bytes_in=frame_bytes(X))
+    if train_mode == "unchanged":
+        rfModel = previous_model
+    elif train_mode == "incremental":
+        ## new trees on the recent weeks, the oldest trees of the previous model age out
+        recent = df_train['week_start'].astype(str).isin(recent_weeks(df_train['week_start'], trained_until)).values
+        rfModel = grow_forest(previous_model, X[recent], y[recent], max_trees=rf_params['n_estimators'],
+                              random_state=int(str(model_time).replace('-', '')))
+    else:
+        ## train model
+        rfModel = RandomForestRegressor(random_state=0, **rf_params)
+        rfModel.fit(X, y)
+    rfModel.trained_until_ = str(model_time)
+    run.stop(rows_out=len(rfModel.estimators_))
     # Predict on train data
+    run.start("evaluate", rows_in=len(X), bytes_in=frame_bytes(X))
     predictions = rfModel.predict(X)
     ## Evaluation of the model
-    df_model_performance = pd.read_csv(df_model_performance_loc+'df_model_performance.csv')
-    df_model_performance = df_model_performance.append([{'model_time': model_time, 'RMSE': np.sqrt(metrics.mean_squared_error(y, predictions)), 'R2': metrics.r2_score(y, predictions)}], ignore_index=True)
-    df_model_performance.to_csv(df_model_performance_loc+'df_model_performance.csv', index=False)
+    ## the same columns every run, so the history is only ever appended to
+    performance = {'model_time': model_time, 'RMSE': np.sqrt(metrics.mean_squared_error(y, predictions)), 'R2': metrics.r2_score(y, predictions),
+                   'train_mode': train_mode, 'n_trees': len(rfModel.estimators_), **rf_params,
+                   'RMSE_cv': None, 'R2_cv': None, 'RMSE_full_refit': None, 'R2_full_refit': None, 'RMSE_drift': None}
+    ## out-of-sample error of the best full-fit parameters (RMSE/R2 above are in-sample)
+    if not df_cv_summary.empty:
+        performance.update({'RMSE_cv': df_cv_summary['RMSE'].iloc[0], 'R2_cv': df_cv_summary['R2'].iloc[0]})
+    if REPORT_DRIFT and train_mode == "incremental":
+        performance.update(drift_vs_full_refit(previous_model, X, y, df_train['week_start'].values, rf_params, trained_until,
+                                               random_state=int(str(model_time).replace('-', ''))))
+    append_csv_row(df_model_performance_loc+'df_model_performance.csv', performance)
+    run.stop(rows_out=1)
 
-    ################################################## 6: save model
+    ################################################## 7: save model
     ## save model
+    run.start("save")
     with open(processed_time_d_loc) as f:
         processed_time_d = csv.reader(f, delimiter=',')
         processed_time_d_list = list(processed_time_d)
-    dirfilename = modelDir + "RandomForestRegression_until_" + processed_time_d_list[1][1]
-    joblib.dump(rfModel, dirfilename)
+    ## uncompressed payload (sklearn model + node arrays) for memory-mapped loading,
+    ## described in the registry manifest (model_registry.py)
+    entry = model_registry.register(
+        "RandomForestRegression_until_" + processed_time_d_list[1][1], rfModel,
+        trained_until=str(model_time), training_window=[str(df_train['week_start'].min()), str(model_time)],
+        features=features_numerical_train + features_categorical_train, metrics=performance)
     ## save Model file path information
-    model_name = pd.read_csv(modelDir+'model_name.csv')
-    model_name = model_name.append([{'model_name': dirfilename}], ignore_index=True)
-    model_name.to_csv(modelDir+'model_name.csv', index=False)
-    ## save the train data
-    df_train.to_csv(df_train_loc+'df_train.csv', index=False)
\ No newline at end of file
+    append_csv_row(modelDir+'model_name.csv', {'model_name': model_registry.path(entry['version'])})
+    run.stop(bytes_out=entry['size_bytes'])
+    ## the train data lives in the feature store (feature_store_loc)
+    run.write(df_model_performance_loc+'training_runs.jsonl', model_time=str(model_time), version=entry['version'])
\ No newline at end of file
@@ -1,296 +1,272 @@
 ################################################## 0: import libraries and define functions
+import os
 import numpy as np
 import pandas as pd
 import csv
 from datetime import datetime, timedelta
-from sklearn.externals import joblib
-from sklearn.preprocessing import LabelEncoder
-from gurobipy import *
-from functools import reduce
-from itertools import groupby
-
-def reduceByKey(func, iterable):
-    """Reduce by key (equivalent to the Spark counterpart)
-    1. Sort by key
-    2. Group by key yielding (key, grouper)
-    3. For each pair yield (key, reduce(func, last element of each grouper))
-    """
-    get_first = lambda p: p[0]
-    get_second = lambda p: p[1]
-    return map(
-        lambda l: (l[0], reduce(func, map(get_second, l[1]))),
-        groupby(sorted(iterable, key=get_first), get_first)
-    )
-
-## concatenate variables at particular index with string s in p
-def concatenate_variables(p, index, s):
-    p_tmp = np.array([str(pi) for pi in p])
-    return p + [s.join(p_tmp[index])]
-
-## extract elements from list based on index
-def extract_from_list_based_on_index(p, index):
-    return tuple([p[i] for i in index])
-
-## input p (df_batch_scored_names,pred_demand) => ((competing_group_vars+'price_sum'),['product_id','price','obj','cost','msrp'])
-def reduce_key_value_map_IPk(p):
-    key = extract_from_list_based_on_index(p, index_reduce_key_vars)
-    value = extract_from_list_based_on_index(p, index_reduce_value_vars)
-    product_id, msrp, cost, price = value
-    sales = max(0, round(p[-1]))
-    obj = (price - cost) * sales
-    return (key, [[product_id, price, obj, cost, msrp]])
+import joblib
+from append_log import last_csv_row
+from dimensions import Dimensions
+from feature_store import price_features
+from model_registry import ModelRegistry
+from price_grid import candidate_grid, group_offsets, group_block
+from price_solver import MILPBackend, cap_price_changes, valid_prices, solve_groups
+from solution_buffer import SolutionBuffer
+from prediction_cache import PredictionCache, model_fingerprint
+from sales_store import read_sales
 
 ################################################## 1: define paths of input files and output files
 ## input paths
-df_train_loc = "D:/samarth/Desktop/PriceOp/Project/train_data/"
 df_sales_loc = "D:/samarth/Desktop/PriceOp/Project/aggregated_sales_data/"
+## partitioned Parquet store written by 1_Sales_Data_Aggregation.py; preferred over df_sales.csv when present
+sales_store_loc = "D:/samarth/Desktop/PriceOp/Project/sales_store/"
+## product/store dimension dictionary written by 1_Sales_Data_Aggregation.py
+dimensions_loc = "D:/samarth/Desktop/PriceOp/Project/aggregated_sales_data/dimensions.npz"
 processed_time_d_loc = "D:/samarth/Desktop/PriceOp/Project/publicparameters/processed_time_df.csv"
 modelDir = "D:/samarth/Desktop/PriceOp/Project/Models/"
 ## output paths
 price_change_d_loc = "D:/samarth/Desktop/PriceOp/Project/medium_results/"
 opt_results_d_loc = "D:/samarth/Desktop/PriceOp/Project/opt_results_data/"
 
-################################################## 2: read into input data and construct df_test
-## read into train data and sales data
-df_train = pd.read_csv(df_train_loc+'df_train.csv')
-df_sales = pd.read_csv(df_sales_loc+'df_sales.csv')
-## get the start date and end date of the current sales cycle
-with open(processed_time_d_loc) as f:
-    processed_time_d = csv.reader(f, delimiter=',')
-    processed_time_d_list = list(processed_time_d)
-processed_time_d = [datetime.strptime(s, '%Y-%m-%d').date() for s in processed_time_d_list[1]]
-
-## construct the df_test
-## construct the df_test based on the lastest week's data
-df_sales_date_max = datetime.strftime(processed_time_d[0], '%Y-%m-%d')
-#print(df_sales.tail())
-df_test = df_sales[df_sales.week_start == df_sales_date_max]
-df_test = df_test.rename(index=str, columns={"week_start": "week_start_origin"})
-## how many weeks to predict ahead: num_weeks_ahead
-# Since we are using synthetic data (with the simulator), it is a must to keep num_weeks_ahead=0, because there are some
-# dependencies with the current version of simulator
-# Note: if working with the real data, we could change this parameter to provide suggested price several weeks ahead the
-# next week
-num_weeks_ahead = 0
-week_start = datetime.strftime(datetime.strptime(df_sales_date_max, '%Y-%m-%d') + timedelta(7*(num_weeks_ahead+1)), '%Y-%m-%d')
-df_test['week_start'] = [week_start] * df_test.shape[0]
-
-## only do optimization for stores in the treatment group
-df_test = df_test[df_test.group_val == 'treatment']
-df_test = df_test.rename(columns={"DepartmentID": "department_id", "BrandID": "brand_id"})
-df_test = df_test[['store_id', 'product_id', 'department_id', 'brand_id', 'MSRP', 'Cost', 'AvgHouseholdIncome', 
-                   'AvgTraffic', 'week_start']]
-df_test = df_test.drop_duplicates()
-
-################################################## 3: load the model built last time
-dirfilename_load = pd.read_csv(modelDir+'model_name.csv')
-dirfilename_load = str(dirfilename_load.iloc[-1,0])
-rfModel = joblib.load(dirfilename_load)
-
-## Direct Integer Programming Optimization function (not using bound algorithm)
-def IPk(p_tmp):
-    global df_optimal
-    instance_reduce_key = p_tmp[0]
-    instance_reduce_value = p_tmp[1]
-    instance_reduce_value = pd.DataFrame(instance_reduce_value, columns=['product_id', 'price', 'obj', 'cost', 'msrp'])
-    instance_reduce_value = instance_reduce_value.sort_values(by=['product_id', 'price'], ascending=[True, True])
-    prod_list = instance_reduce_value['product_id'].tolist()
-    obj_list = instance_reduce_value['obj'].tolist()
-    price_list = instance_reduce_value['price'].tolist()
-    products_num = len(instance_reduce_value['product_id'].unique())
-    ## get whether_valid_price, if equal to 1, valid, if equal to 0, invalid
-    ## invalid ones needed to set into the constrains
-    instance_reduce_value['whether_valid_price'] = instance_reduce_value.apply(
-        lambda row: 1 if row['price'] >= row['cost'] and row['price'] <= row['msrp'] else 0, axis=1)
-    for i in range(products_num):
-        whether_valid_price_individual_product = instance_reduce_value['whether_valid_price'].iloc[
-                                                 price_K * i:price_K * (i + 1) - 1]
-        if all(whether_valid_price == 0 for whether_valid_price in whether_valid_price_individual_product):
-            abs_diff_price = abs(
-                instance_reduce_value['msrp'].iloc[price_K * i:price_K * (i + 1)] - instance_reduce_value[
-                                                                                            'price'].iloc[
-                                                                                        price_K * i:price_K * (
-                                                                                        i + 1)])
-            row_index = i * price_K + min(enumerate(abs_diff_price), key=lambda x: x[1])[0]
-            instance_reduce_value.iloc[row_index, instance_reduce_value.columns.get_loc('whether_valid_price')] = 1
-    
-    whether_valid_price_list = instance_reduce_value['whether_valid_price'].tolist()
-    
-    model = Model()
-    model.setParam("OutputFlag", 0)
-
-    # Add variables to model
-    vars = []
-    for j in range(len(instance_reduce_value)):
-        vars.append(model.addVar(vtype=GRB.BINARY))
-
-    # Populate objective
-    obj = LinExpr()
-    for j in range(len(instance_reduce_value)):
-        obj += obj_list[j]*vars[j]
-    model.setObjective(obj, GRB.MAXIMIZE)        
-
-    # Populate constr 1 matrix
-    for i in range(products_num):
-        expr1 = LinExpr()
-        for j in range(len(instance_reduce_value)):
-            if ((j >= price_K * i) & (j < price_K * (i + 1))):
-                expr1 += vars[j]
-        model.addConstr(expr1, GRB.EQUAL, 1)
-
-    # Populate constr 2 matrix
-    expr2 = LinExpr()
-    for j in range(len(instance_reduce_value)):
-        expr2 += price_list[j]*vars[j]
-    model.addConstr(expr2, GRB.EQUAL, instance_reduce_key[3])
-    
-    # Populate constr 3 matrix
-    expr3 = LinExpr()
-    for j in range(len(instance_reduce_value)):
-        if whether_valid_price_list[j] == 0:
-            expr3 += vars[j]
-    model.addConstr(expr3, GRB.EQUAL, 0)
-
-    #model.write("File.lp")
-    # Solve
-    model.optimize()
-    
-    if model.Status == GRB.OPTIMAL:
-        obj_val = model.objVal
-        solution = []
-        for v in model.getVars():
-            solution.append(v.X)
-        solution = [a*b for a,b in zip(solution,price_list)]
-        solution = list(filter(lambda a: a != 0, solution))
-        for k in range(products_num):
-            df_optimal = df_optimal.append({'week_start' : instance_reduce_key[2],
-                                            'department_id' : instance_reduce_key[1],
-                                            'store_id' : instance_reduce_key[0],
-                                            'price_sum' : instance_reduce_key[3],
-                                            'product_id' : prod_list[price_K * k],
-                                            'profit_obj_val' : obj_val,
-                                            'price' : solution[k]},
-                                            ignore_index=True)
-    
-    model.reset()
-    #print("\n------------------------------------------------------------------------------\n")
-
-################################################## 4: optimization
-##define categorical features, which used in modeling
-features_categorical_train_and_test = ["department_id", "brand_id"]
-features_numerical_train_and_test = ["price", "AvgHouseholdIncome", "AvgTraffic", "rl_price", "discount"]
-##feature index the categorical features
-for each in features_categorical_train_and_test:
-    df_test[each] = df_test[each].astype("category")
-
-## step 4.1: input for whole prize optimization
-## input 1: df (Spark DataFrame) here: M*CP
-df = df_test
-df = df.reset_index(drop=True)
-## input 2: competing_group_vars
-competing_group_vars = ['week_start', 'department_id', 'store_id']
-## add an index number for competing groups
-df_names = df.columns.tolist()
-concatenate_index = [df.columns.get_loc(c) for c in df.columns if c in competing_group_vars]
-df = [concatenate_variables(list(row), concatenate_index, '_') for index, row in df.iterrows()]
-df = pd.DataFrame(df, columns=df_names+["competing_group_index_column_name"])
-le = LabelEncoder()
-df[['competing_group_index_column_name']] = le.fit_transform(df[['competing_group_index_column_name']])
-df = df.rename(index=str, columns={"competing_group_index_column_name": "competing_group_index_column_name_StringIndexed"})
-##feature index the categorical features
-for each in features_categorical_train_and_test:
-    df[each] = df[each].astype("category")
-df['store_id'] = df['store_id'].astype("category")
-
-price_K = 10
-
-##calculate the range of price and price sum
-min_cost_df = pd.DataFrame(df.groupby(competing_group_vars)['Cost'].agg(min))
-min_cost_df = min_cost_df.rename(columns={'Cost':'min_cost'})
-min_cost_df = min_cost_df.reset_index(drop=False)
-
-max_msrp_df = pd.DataFrame(df.groupby(competing_group_vars)['MSRP'].agg(max))
-max_msrp_df = max_msrp_df.rename(columns={'MSRP':'max_msrp'})
-max_msrp_df = max_msrp_df.reset_index(drop=False)
-
-count_df = pd.DataFrame(df.groupby(competing_group_vars)['MSRP'].agg('count'))
-count_df = count_df.rename(columns={'MSRP':'count'})
-count_df = count_df.reset_index(drop=False)
-
-price_range_df=pd.merge(df, min_cost_df, on=competing_group_vars)
-price_range_df=pd.merge(price_range_df, max_msrp_df, on=competing_group_vars)
-price_range_df=pd.merge(price_range_df, count_df, on=competing_group_vars)
-
-price_single_range_df = [[pr[-5]]+[pr[2]]+[pr[0]]+[pr[-1]]+[i] for index, pr in price_range_df.iterrows() for i in
-                         np.linspace(pr[-3], pr[-2], price_K).tolist()]
-price_single_range_df = pd.DataFrame(price_single_range_df , columns=competing_group_vars + ["count", "price"])
-
-price_sum_range_df = [[pr[-5]]+[pr[2]]+[pr[0]]+[i] for index, pr in price_range_df.iterrows() for i in
-                      np.linspace(pr[-1] * pr[-3], pr[-1] * pr[-2], (price_K - 1) * pr[-1] + 1).tolist()]
-price_sum_range_df = pd.DataFrame(price_sum_range_df, columns=competing_group_vars + ["price_sum"])
-
-price_single_sum_range_df=pd.merge(price_single_range_df, price_sum_range_df, on=competing_group_vars).drop_duplicates()
-price_single_sum_range_df['department_id'] = price_single_sum_range_df['department_id'].astype("category")
-price_single_sum_range_df['store_id'] = price_single_sum_range_df['store_id'].astype("category")
-
-df_price_added = pd.merge(df, price_single_sum_range_df, on=competing_group_vars, how="outer").drop_duplicates()
-
-df_price_added['rl_price'] = df_price_added['price'] * df_price_added['count'] /  df_price_added['price_sum']
-df_price_added['discount'] = df_price_added['MSRP'] - df_price_added['price'] / df_price_added['MSRP']
-
-features_modeled_test = features_numerical_train_and_test + features_categorical_train_and_test  ##no label, only features
-df_price_added1 = df_price_added[features_modeled_test]
-
-predictions = pd.DataFrame(rfModel.predict(df_price_added1), columns=['predictions'])
-
-df_for_output = pd.concat([df_price_added,predictions],axis=1)
-
-## 4.2.2: reduce the df_for_output to the competing group level
-
-## calculate the objective function: (price-cost)*pred_demand
-reduce_key_vars = ['store_id', 'department_id', 'week_start', 'price_sum']
-reduce_value_vars = ['product_id', 'MSRP', 'Cost', 'price']
-index_reduce_key_vars = [df_price_added.columns.get_loc(c) for c in df_price_added.columns if c in reduce_key_vars]
-index_reduce_value_vars = [df_price_added.columns.get_loc(c) for c in df_price_added.columns if c in reduce_value_vars]
-
-## reducebyKey: competing_vars + ['price_sum','product_id','price']
-df_reduced = df_for_output.apply(reduce_key_value_map_IPk, axis=1)
-df_reduced = list(reduceByKey(lambda x, y: x + y, df_reduced))
-
-
-df_optimal_names = ['week_start', 'department_id', 'store_id', 'price_sum', 'product_id', 'price']
-df_optimal = pd.DataFrame(columns = df_optimal_names)
-
-df_reduced = list(map(IPk, df_reduced))
-
-grouping_vars = ['week_start', 'store_id', 'department_id']
-df_best_profit = pd.DataFrame(df_optimal.groupby(grouping_vars)['profit_obj_val'].agg(max))
-df_best_profit = df_best_profit.reset_index(drop=False)
-
-for each in ['store_id', 'department_id']:
-    df_optimal[each] = df_optimal[each].astype("int64")
-
-df_optimal2 = pd.merge(df_optimal, df_best_profit, on=grouping_vars+['profit_obj_val'])
-
-for each in ['department_id', 'store_id']:
-    df_optimal2[each] = df_optimal2[each].astype("category")
-
-df_optimal3 = pd.merge(df_optimal2, df_for_output, on=['week_start', 'department_id', 'store_id', 
-                                                       'price_sum', 'product_id', 'price'])
-
-price_change_names = ['product_id', 'store_id', 'week_start', 'price']
-price_change_df = df_optimal3[price_change_names]
-price_change_df_name = price_change_d_loc+'suggested_prices_'+processed_time_d[1].strftime('%Y-%m-%d')+'.csv'
-price_change_df.to_csv(price_change_df_name, index=False)
-
-df_opt = df_optimal3[['week_start', 'store_id', 'product_id', 'MSRP', 'Cost', 'price', 'predictions']]
-df_opt = df_opt.rename(index=str, columns={"price": "price_recommendation", "predictions": "demand_forecast"})
-df_opt_name = opt_results_d_loc + 'recommendations_for_' + processed_time_d[1].strftime('%Y-%m-%d')+'.csv'
-df_opt.to_csv(df_opt_name, index=False)
-
-if (os.path.exists('D:/samarth/Desktop/PriceOp/Project/opt_results_data/df_recommendations.csv')):
-    df_opt_cumulative = pd.read_csv(opt_results_d_loc+'df_recommendations.csv')
-    df_opt_cumulative = pd.concat([df_opt_cumulative, df_opt], ignore_index=True)
-    df_opt_cumulative.to_csv(opt_results_d_loc+'df_recommendations.csv', index=False)
-else:
-    df_opt.to_csv(opt_results_d_loc+'df_recommendations.csv', index=False)
\ No newline at end of file
+## score candidates with the registry's memory-mapped node arrays (forest_arrays.py) instead of the
+## sklearn model: processes on one host then share one copy of the forest through the page cache,
+## at the cost of slower single-core prediction
+SHARED_FOREST = False
+
+## keep candidate predictions between runs (prediction_cache.py), one LRU store per model version:
+## a rerun for the same week with the same model then scores no rows at all
+PERSIST_PREDICTIONS = False
+prediction_cache_loc = "D:/samarth/Desktop/PriceOp/Project/prediction_cache/"
+
+## price selection backend (price_solver.py):
+##   "dp": exact dynamic program solving all price_sums of a competing group at once
+##   "milp": one open-source (SciPy/HiGHS) MILP per competing group, price_sum chosen inside the model
+##   "gurobi": one Gurobi integer program per (competing group, price_sum), needs a Gurobi license
+## "milp" and "gurobi" are warm-started from the latest prices in df_recommendations.csv
+SOLVER = "dp"
+## time limit per competing group for "milp" (None: solve to optimality)
+MILP_TIME_LIMIT_S = None
+## worker processes for the solve (1: serial, None: all cores)
+SOLVE_WORKERS = None
+
+## rolling price plan: optimize HORIZON_WEEKS consecutive weeks in one run (4-8 for a plan, 1: next week
+## only); their candidates share one grid build and one batched predict, and their groups one solve
+HORIZON_WEEKS = 1
+## cap on a product's price change between consecutive weeks, as a fraction of the previous week's price
+## (None: no cap); the first week is capped against the latest prices in df_recommendations.csv. Capped
+## weeks are solved one after another, each against the prices chosen for the week before
+MAX_PRICE_CHANGE = None
+
+## the solver pool re-imports this script on spawn-based platforms (Windows),
+## so the pipeline only runs when it is executed as a script
+if __name__ == "__main__":
+    ################################################## 2: read into input data and construct df_test
+    ## read into sales data
+    ## get the start date and end date of the current sales cycle
+    with open(processed_time_d_loc) as f:
+        processed_time_d = csv.reader(f, delimiter=',')
+        processed_time_d_list = list(processed_time_d)
+    processed_time_d = [datetime.strptime(s, '%Y-%m-%d').date() for s in processed_time_d_list[1]]
+    if os.path.isdir(sales_store_loc):
+        ## only the latest week's partitions of treatment stores; attributes are gathered by dimension code
+        dims = Dimensions.load(dimensions_loc)
+        df_sales = read_sales(sales_store_loc, weeks=[processed_time_d[0]], stores=dims.stores_where('group_val', 'treatment'),
+                              columns=['week_start', 'store_id', 'product_id'])
+        df_sales = dims.attach(df_sales)
+    else:
+        df_sales = pd.read_csv(df_sales_loc+'df_sales.csv')
+
+    ## construct the df_test
+    ## construct the df_test based on the lastest week's data
+    df_sales_date_max = datetime.strftime(processed_time_d[0], '%Y-%m-%d')
+    #print(df_sales.tail())
+    df_test = df_sales[df_sales.week_start == df_sales_date_max]
+    df_test = df_test.rename(index=str, columns={"week_start": "week_start_origin"})
+    ## how many weeks to predict ahead: num_weeks_ahead
+    # Since we are using synthetic data (with the simulator), it is a must to keep num_weeks_ahead=0, because there are some
+    # dependencies with the current version of simulator
+    # Note: if working with the real data, we could change this parameter to provide suggested price several weeks ahead the
+    # next week
+    num_weeks_ahead = 0
+    ## one copy of the products per week of the horizon
+    week_starts = [datetime.strftime(datetime.strptime(df_sales_date_max, '%Y-%m-%d') + timedelta(7*(num_weeks_ahead+1+h)), '%Y-%m-%d')
+                   for h in range(HORIZON_WEEKS)]
+    df_test = pd.concat([df_test.assign(week_start=week_start) for week_start in week_starts], ignore_index=True)
+
+    ## only do optimization for stores in the treatment group
+    df_test = df_test[df_test.group_val == 'treatment']
+    df_test = df_test.rename(columns={"DepartmentID": "department_id", "BrandID": "brand_id"})
+    df_test = df_test[['store_id', 'product_id', 'department_id', 'brand_id', 'MSRP', 'Cost', 'AvgHouseholdIncome', 
+                       'AvgTraffic', 'week_start']]
+    df_test = df_test.drop_duplicates()
+
+    ################################################## 3: load the model built last time
+    model_registry = ModelRegistry(modelDir)
+    if model_registry.latest() is not None:
+        ## uncompressed registry payload, opened memory-mapped instead of read and unpickled from a stream
+        rfModel = model_registry.load_forest() if SHARED_FOREST else model_registry.load_model(mmap_mode='r')
+        model_version = model_registry.latest()
+        model_file = model_registry.path()
+    else:
+        dirfilename_load = last_csv_row(modelDir+'model_name.csv')['model_name']
+        rfModel = joblib.load(dirfilename_load)
+        model_version = os.path.splitext(os.path.basename(dirfilename_load))[0]
+        model_file = dirfilename_load
+
+    ## Price selection for the competing group in candidate rows start:end, same constraints and objective
+    ## for every SOLVER backend (price_solver.py). group_task packs the group into the backend's compact
+    ## arrays, add_solution writes its solution into the SolutionBuffer solutions
+    def group_task(start, end):
+        count = group_count[start]
+        group_price = group_block(price, start, end, count, price_K)[0, :, 0]
+        group_cost = group_block(cost, start, end, count, price_K)[:, 0, 0]
+        group_msrp = group_block(msrp, start, end, count, price_K)[:, 0, 0]
+        ## sales[t, i, k]: demand of product i at candidate price k when the group total is the t-th price_sum
+        group_sales = group_block(sales, start, end, count, price_K).transpose(2, 0, 1)
+        margin = group_price[None, :] - group_cost[:, None]
+        group_valid = valid_prices(np.broadcast_to(group_price, margin.shape), group_cost, group_msrp)
+        if MAX_PRICE_CHANGE is not None:
+            step = (end - start) // count
+            previous = [previous_prices.get((store, product), np.nan)
+                        for store, product in zip(store_id[start:end:step], product_id[start:end:step])]
+            group_valid = cap_price_changes(group_valid, group_price, previous, MAX_PRICE_CHANGE)
+        return margin, group_sales, group_valid, group_price, group_block(price_sum, start, end, count, price_K)[0, 0]
+
+    ## warm start: the group's products at their previous prices (nearest candidate), None if one is new
+    def group_warm_start(start, end):
+        count = group_count[start]
+        step = (end - start) // count
+        previous = [previous_prices.get((store, product))
+                    for store, product in zip(store_id[start:end:step], product_id[start:end:step])]
+        if any(previous_price is None for previous_price in previous):
+            return None
+        group_price = group_block(price, start, end, count, price_K)[0, :, 0]
+        return np.abs(np.array(previous)[:, None] - group_price[None, :]).argmin(axis=1)
+
+    def add_solution(start, end, solution, solutions):
+        best, choice = solution
+        n_sums = len(best)
+        solved = np.flatnonzero(~np.isnan(best))
+        ## candidate of product i at price k for the t-th price_sum is row start + i * price_K * n_sums + k * n_sums + t
+        rows = start + np.arange(choice.shape[1]) * price_K * n_sums + choice[solved] * n_sums + solved[:, None]
+        solutions.add(group_code[start], price_sum[start + solved], best[solved], rows)
+
+    ################################################## 4: optimization
+    ##define categorical features, which used in modeling
+    features_categorical_train_and_test = ["department_id", "brand_id"]
+    features_numerical_train_and_test = ["price", "AvgHouseholdIncome", "AvgTraffic", "rl_price", "discount"]
+    ##feature index the categorical features
+    for each in features_categorical_train_and_test:
+        df_test[each] = df_test[each].astype("category")
+
+    ## step 4.1: input for whole prize optimization
+    ## input 1: df, one row per product to price
+    df = df_test
+    df = df.reset_index(drop=True)
+    ## input 2: competing_group_vars
+    competing_group_vars = ['week_start', 'department_id', 'store_id']
+    ## add an index number for competing groups
+    df['competing_group_index_column_name_StringIndexed'] = df.groupby(competing_group_vars, observed=True).ngroup()
+    ## products sorted by competing group, in product_id order inside a group, so the candidate grid
+    ## below is sorted by group as well
+    df = df.sort_values(['competing_group_index_column_name_StringIndexed', 'product_id'], kind='stable', ignore_index=True)
+    ##feature index the categorical features
+    for each in features_categorical_train_and_test:
+        df[each] = df[each].astype("category")
+    df['store_id'] = df['store_id'].astype("category")
+
+    price_K = 10
+
+    ## every product crossed with its competing group's candidate prices (min cost .. max MSRP)
+    ## and candidate price sums, built from group codes in one pass (price_grid.py)
+    df_price_added = candidate_grid(df, competing_group_vars, price_K)
+
+    ## same feature definitions the model was trained on (feature_store.py)
+    df_price_added['rl_price'], df_price_added['discount'] = price_features(
+        df_price_added['price'], df_price_added['count'], df_price_added['price_sum'], df_price_added['MSRP'])
+
+    features_modeled_test = features_numerical_train_and_test + features_categorical_train_and_test  ##no label, only features
+    df_price_added1 = df_price_added[features_modeled_test]
+
+    ## each distinct feature row is scored once (and not at all if the stored cache of this model has it)
+    ## stored predictions are only reused for the very model that produced them (same file content)
+    if PERSIST_PREDICTIONS:
+        prediction_cache = PredictionCache(model_version, prediction_cache_loc, max_entries=1_000_000,
+                                           fingerprint=model_fingerprint(model_file))
+    else:
+        prediction_cache = PredictionCache(model_version)
+    predictions = pd.DataFrame(prediction_cache.predict(rfModel, df_price_added1.values), columns=['predictions'])
+    prediction_cache.save()
+    prediction_stats = prediction_cache.report()
+    print("predictions: {} rows, {} distinct, {} scored, hit rate {:.1%}".format(
+        prediction_stats['rows'], prediction_stats['unique_rows'], prediction_stats['predicted_rows'], prediction_stats['hit_rate']))
+
+    df_for_output = pd.concat([df_price_added,predictions],axis=1)
+
+    ## candidate columns as arrays; competing group g is the candidate rows offsets[g]:offsets[g + 1],
+    ## each product of it a block of price_K x n_sums rows (group_block)
+    group_code = df_for_output['competing_group_index_column_name_StringIndexed'].values
+    group_count = df_for_output['count'].values
+    price = df_for_output['price'].values
+    price_sum = df_for_output['price_sum'].values
+    cost = df_for_output['Cost'].values
+    msrp = df_for_output['MSRP'].values
+    ## pred_demand = max(0, round(prediction)); the backends maximise (price-cost)*pred_demand
+    sales = np.maximum(0, np.round(df_for_output['predictions'].values)).astype(np.int32)
+    offsets = group_offsets(group_code)
+    group_ranges = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+
+    store_id = df_for_output['store_id'].astype('int64').values
+    product_id = df_for_output['product_id'].astype(str).values
+    week_of_row = df_for_output['week_start'].astype(str).values
+
+    ## previous prices per (store_id, product_id), for warm starts and the price change cap: the latest
+    ## recommendations before the horizon, then the prices chosen for each solved week
+    previous_prices = {}
+    if (SOLVER != "dp" or MAX_PRICE_CHANGE is not None) and os.path.exists(opt_results_d_loc+'df_recommendations.csv'):
+        df_previous = pd.read_csv(opt_results_d_loc+'df_recommendations.csv',
+                                  usecols=['week_start', 'store_id', 'product_id', 'price_recommendation'])
+        df_previous = df_previous[df_previous['week_start'] < week_starts[0]]
+        df_previous = df_previous[df_previous['week_start'] == df_previous['week_start'].max()]
+        previous_prices = dict(zip(zip(df_previous['store_id'], df_previous['product_id'].astype(str)),
+                                   df_previous['price_recommendation']))
+
+    ## all weeks' groups in one solve; with a price change cap, one week after another
+    if MAX_PRICE_CHANGE is None:
+        solve_passes = [group_ranges]
+    else:
+        solve_passes = [[(start, end) for start, end in group_ranges if week_of_row[start] == week_start]
+                        for week_start in week_starts]
+
+    backend = MILPBackend(time_limit=MILP_TIME_LIMIT_S) if SOLVER == "milp" else SOLVER
+    best_rows = []
+    for pass_ranges in solve_passes:
+        ## one entry per product of every solved (competing group, price_sum), at most one per price_K candidates
+        solutions = SolutionBuffer(sum(end - start for start, end in pass_ranges) // price_K)
+        warm_starts = [group_warm_start(start, end) for start, end in pass_ranges] if SOLVER != "dp" else None
+        ## groups are solved in SOLVE_WORKERS processes and gathered in group order, same result as serial
+        tasks = (group_task(start, end) for start, end in pass_ranges)
+        for (start, end), solution in zip(pass_ranges, solve_groups(tasks, backend, warm_starts, max_workers=SOLVE_WORKERS)):
+            add_solution(start, end, solution, solutions)
+        ## candidates of the most profitable price_sum of every competing group
+        best_rows.append(solutions.best())
+        previous_prices.update(zip(zip(store_id[best_rows[-1]], product_id[best_rows[-1]]), price[best_rows[-1]]))
+
+    df_optimal3 = df_for_output.loc[np.concatenate(best_rows)]
+
+    price_change_names = ['product_id', 'store_id', 'week_start', 'price']
+    price_change_df = df_optimal3[price_change_names]
+    price_change_df_name = price_change_d_loc+'suggested_prices_'+processed_time_d[1].strftime('%Y-%m-%d')+'.csv'
+    price_change_df.to_csv(price_change_df_name, index=False)
+
+    df_opt = df_optimal3[['week_start', 'store_id', 'product_id', 'MSRP', 'Cost', 'price', 'predictions']]
+    df_opt = df_opt.rename(index=str, columns={"price": "price_recommendation", "predictions": "demand_forecast"})
+    df_opt_name = opt_results_d_loc + 'recommendations_for_' + processed_time_d[1].strftime('%Y-%m-%d')+'.csv'
+    df_opt.to_csv(df_opt_name, index=False)
+
+    if (os.path.exists('D:/samarth/Desktop/PriceOp/Project/opt_results_data/df_recommendations.csv')):
+        df_opt_cumulative = pd.read_csv(opt_results_d_loc+'df_recommendations.csv')
+        df_opt_cumulative = pd.concat([df_opt_cumulative, df_opt], ignore_index=True)
+        df_opt_cumulative.to_csv(opt_results_d_loc+'df_recommendations.csv', index=False)
+    else:
+        df_opt.to_csv(opt_results_d_loc+'df_recommendations.csv', index=False)
@@ -0,0 +1,188 @@
+##################################################
+# Persisted state for incremental sales aggregation
+##################################################
+#
+# A state directory holds
+#   state.json          anchor date, every log already folded in
+#                       (name -> store, trading day, size, mtime_ns) and the
+#                       per-store watermark (latest trading day folded in)
+#                       and the counts file of every week
+#   weekly_counts_<week_start>_<generation>.csv
+#                       running sales per (store_id, product_id) of one week
+#
+# Counts are kept per week so a run only reads and rewrites the weeks its
+# new logs fall in (plus the weeks to_frame() returns): its cost follows
+# the volume of new logs, not the length of the history. A save writes the
+# touched weeks as a new generation first and then atomically replaces
+# state.json, which names the file of each week. An interrupted run
+# therefore leaves the previous, consistent state and simply re-parses its
+# logs next time.
+#
+# Weeks are 7-day buckets counted from the anchor, so the state can be
+# reused with any anchor a whole number of weeks away (the window start
+# moves on every cycle). A log delivered again with other content (another
+# size or mtime) cannot be taken back out of the running counts; the state
+# is then rebuilt from the logs of the current window.
+
+import os
+import json
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from sales_logs import WeeklySalesCounter
+
+
+STATE_FILE = "state.json"
+
+
+class AggregationState:
+    """Running weekly counts plus a manifest of the logs they cover."""
+
+    def __init__(self, state_dir, anchor):
+        self.state_dir = state_dir
+        self.anchor = anchor
+        self.logs = {}
+        self.watermarks = {}
+        self.generation = 0
+        ## week_start -> counts file; counter holds the weeks touched by this run only
+        self.weeks = {}
+        self.counter = WeeklySalesCounter(anchor)
+        self._touched = set()
+        self._stale = []
+
+    @classmethod
+    def load(cls, state_dir, anchor):
+        """Load the state in state_dir, or start an empty one.
+
+        Counts are bucketed relative to the anchor, so a state built for an
+        anchor that is not a whole number of weeks away cannot be reused and
+        raises ValueError.
+        """
+        state = cls(state_dir, anchor)
+        state_path = os.path.join(state_dir, STATE_FILE)
+        if not os.path.exists(state_path):
+            return state
+
+        with open(state_path) as f:
+            meta = json.load(f)
+        shift = (anchor - datetime.strptime(meta["anchor"], "%Y-%m-%d").date()).days
+        if shift % 7:
+            raise ValueError(
+                f"state in {state_dir} is anchored at {meta['anchor']}, {shift} days from {anchor} "
+                "(not whole weeks); remove it to rebuild from scratch"
+            )
+        state.logs = meta["logs"]
+        state.watermarks = {int(k): v for k, v in meta["watermarks"].items()}
+        state.generation = meta["generation"]
+        state.weeks = meta.get("weeks", {})
+        if "counts_file" in meta:
+            ## single counts file of states saved before per-week files: split on the next save
+            state.counter.counts = _read_counts(os.path.join(state_dir, meta["counts_file"]))
+            state._touched = {week for week, _, _ in state.counter.counts}
+            state._stale.append(meta["counts_file"])
+        return state
+
+    def _counts_path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    def _touch(self, weeks):
+        """Load the stored counts of weeks not touched yet into the counter."""
+        for week in set(weeks) - self._touched:
+            if str(week) in self.weeks:
+                self.counter.merge(_read_counts(self._counts_path(self.weeks[str(week)]), week))
+            self._touched.add(week)
+
+    def pending(self, logs):
+        """The (path, store_id, stamp) logs from discover_logs not folded in yet.
+
+        When a log folded in before has changed since, the state is reset and
+        all of logs are returned, so the counts are rebuilt without its old content.
+        """
+        logs = list(logs)
+        if any(self._changed(path) for path, _, _ in logs):
+            self._stale.extend(self.weeks.values())
+            self.logs, self.watermarks, self.weeks = {}, {}, {}
+            self.counter = WeeklySalesCounter(self.anchor)
+            self._touched = set()
+            return logs
+        return [log for log in logs if os.path.basename(log[0]) not in self.logs]
+
+    def _changed(self, path):
+        recorded = self.logs.get(os.path.basename(path))
+        if recorded is None:
+            return False
+        stat = os.stat(path)
+        ## states written before mtimes were recorded are checked by size only
+        return stat.st_size != recorded["size"] or stat.st_mtime_ns != recorded.get("mtime_ns", stat.st_mtime_ns)
+
+    def fold(self, counts, logs):
+        """Add partial counts and record the logs they came from."""
+        self._touch(week for week, _, _ in counts)
+        self.counter.merge(counts)
+        for path, store_id, stamp in logs:
+            day = str((stamp - timedelta(days=1)).date())
+            stat = os.stat(path)
+            self.logs[os.path.basename(path)] = {
+                "store_id": store_id, "day": day, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            }
+            if day > self.watermarks.get(store_id, ""):
+                self.watermarks[store_id] = day
+
+    def save(self):
+        """Write the touched weeks as a new generation, then state.json naming them."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.generation += 1
+        by_week = {}
+        for (week, store_id, product_id), sales in self.counter.counts.items():
+            by_week.setdefault(week, []).append((store_id, product_id, sales))
+        replaced = []
+        for week in sorted(self._touched):
+            counts_file = f"weekly_counts_{week}_{self.generation}.csv"
+            pd.DataFrame(sorted(by_week.get(week, [])), columns=["store_id", "product_id", "sales"]).to_csv(
+                self._counts_path(counts_file), index=False)
+            if str(week) in self.weeks:
+                replaced.append(self.weeks[str(week)])
+            self.weeks[str(week)] = counts_file
+
+        meta = {
+            "anchor": str(self.anchor),
+            "updated": datetime.now().isoformat(timespec="seconds"),
+            "generation": self.generation,
+            "watermarks": {str(k): v for k, v in sorted(self.watermarks.items())},
+            "weeks": dict(sorted(self.weeks.items())),
+            "logs": self.logs,
+        }
+        state_path = os.path.join(self.state_dir, STATE_FILE)
+        with open(state_path + ".tmp", "w") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(state_path + ".tmp", state_path)
+
+        for name in replaced + self._stale:
+            if os.path.exists(self._counts_path(name)):
+                os.remove(self._counts_path(name))
+        self._stale = []
+
+    def to_frame(self, start_date=None, end_date=None):
+        """Weekly sales of the weeks in [start_date, end_date], reading only those weeks."""
+        weeks = {datetime.strptime(week, "%Y-%m-%d").date() for week in self.weeks} | self._touched
+        weeks = {
+            week for week in weeks
+            if (start_date is None or week >= start_date) and (end_date is None or week <= end_date)
+        }
+        counter = WeeklySalesCounter(self.anchor)
+        counter.counts = Counter({key: sales for key, sales in self.counter.counts.items() if key[0] in weeks})
+        for week in weeks - self._touched:
+            counter.merge(_read_counts(self._counts_path(self.weeks[str(week)]), week))
+        return counter.to_frame()
+
+
+def _read_counts(path, week=None):
+    """Counter of (week_start, store_id, product_id) -> sales from a counts file (of week, if given)."""
+    df_counts = pd.read_csv(path, dtype={"product_id": str})
+    weeks = [week] * len(df_counts) if week is not None else pd.to_datetime(df_counts["week_start"]).dt.date
+    return Counter(dict(zip(
+        zip(weeks, df_counts["store_id"].tolist(), df_counts["product_id"]),
+        df_counts["sales"].tolist(),
+    )))
@@ -0,0 +1,115 @@
+##################################################
+# Append-only record files
+##################################################
+#
+# Run histories (df_model_performance.csv, model_name.csv, the model
+# registry manifest) used to be read in full, extended and written back on
+# every run, so each run got slower as the history grew and a crash during
+# the rewrite could lose all of it. Here a record is one line appended with
+# a single write and fsync, and the latest record is read from the end of
+# the file, so both cost O(1) in the length of the history.
+#
+# A crash can at worst leave a torn last line without its newline. Readers
+# ignore it and the next append cuts it off before writing, so earlier
+# records are never touched.
+
+import io
+import os
+import csv
+
+
+_BLOCK = 4096
+
+
+def _last_newline(f, end):
+    """Offset just past the last b"\\n" before end, 0 if there is none."""
+    pos = end
+    while pos > 0:
+        start = max(0, pos - _BLOCK)
+        f.seek(start)
+        found = f.read(pos - start).rfind(b"\n")
+        if found >= 0:
+            return start + found + 1
+        pos = start
+    return 0
+
+
+def append_line(path, line):
+    """Append one record line (no trailing newline) to path, durably."""
+    data = line.encode("utf-8") + b"\n"
+    with open(path, "a+b") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                ## torn record from an interrupted append
+                f.truncate(_last_newline(f, size))
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def last_line(path):
+    """(offset, text) of the last complete line of path, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = _last_newline(f, f.tell())
+        if end == 0:
+            return None
+        start = _last_newline(f, end - 1)
+        f.seek(start)
+        return start, f.read(end - 1 - start).decode("utf-8").rstrip("\r")
+
+
+def _csv_line(values):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="").writerow(values)
+    return buf.getvalue()
+
+
+def _csv_header(path):
+    with open(path, newline="") as f:
+        first = f.readline()
+    return next(csv.reader([first])) if first.endswith("\n") else None
+
+
+def append_csv_row(path, row):
+    """Append dict row to the CSV at path, writing the header for a new file.
+
+    Columns missing from row are left empty. Keys the header does not have
+    yet widen the file once: it is rewritten with the new columns to a
+    temporary file and renamed into place.
+    """
+    header = _csv_header(path) if os.path.exists(path) and os.path.getsize(path) else None
+    if header is None:
+        header = list(row)
+        tmp = path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            f.write(_csv_line(header) + "\n")
+        os.replace(tmp, path)
+    elif any(key not in header for key in row):
+        header = header + [key for key in row if key not in header]
+        tmp = path + ".tmp"
+        with open(path, newline="") as src:
+            text = src.read()
+        ## complete lines only, a torn last record is dropped
+        records = csv.DictReader(io.StringIO(text[:text.rfind("\n") + 1]))
+        with open(tmp, "w", newline="") as dst:
+            writer = csv.DictWriter(dst, fieldnames=header, lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(records)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp, path)
+    append_line(path, _csv_line(["" if row.get(key) is None else row[key] for key in header]))
+
+
+def last_csv_row(path):
+    """The last data row of the CSV at path as a dict, or None when it has no rows."""
+    found = last_line(path)
+    if found is None or found[0] == 0:
+        return None
+    return dict(zip(_csv_header(path), next(csv.reader([found[1]]))))
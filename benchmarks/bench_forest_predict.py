@@ -0,0 +1,69 @@
+##################################################
+# Benchmark: forest prediction on the optimizer's candidate grid
+##################################################
+#
+# Builds a synthetic dataset, aggregates it, trains the demand forest and
+# builds the price-candidate matrix the optimizer scores (see
+# bench_pipeline.py), then compares RandomForestRegressor.predict with the
+# flattened ForestArrays predictor. Outputs must be identical. Run from the
+# project root:
+#
+#   python benchmarks/bench_forest_predict.py [size] [repeats]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import FEATURES, SIZES, candidate_grid, stage_aggregate, stage_train
+from forest_arrays import ForestArrays
+from synthetic_data import generate_dataset
+
+
+def best_of(func, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(X)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    import joblib
+
+    size = sys.argv[1] if len(sys.argv) > 1 else "small"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    base = tempfile.mkdtemp(prefix="bench_forest_")
+    try:
+        data_dir = os.path.join(base, "Data Files")
+        generate_dataset(data_dir, **SIZES[size])
+        stage_aggregate(data_dir, base, mode="all_logs")
+        stage_train(data_dir, base)
+        model = joblib.load(os.path.join(base, "model.joblib"))
+        X = candidate_grid(pd.read_csv(os.path.join(base, "df_sales.csv")))[FEATURES].values
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+    start = time.perf_counter()
+    forest = ForestArrays.from_sklearn(model)
+    t_export = time.perf_counter() - start
+
+    ## single-threaded on both sides
+    model.set_params(n_jobs=1)
+    assert np.array_equal(model.predict(X), forest.predict(X))
+
+    t_sklearn = best_of(model.predict, X, repeats)
+    t_arrays = best_of(forest.predict, X, repeats)
+
+    print(f"candidate matrix: {X.shape[0]} rows x {X.shape[1]} features, {forest.n_trees} trees")
+    print(f"export                        : {t_export * 1000:9.1f} ms")
+    print(f"RandomForestRegressor.predict : {t_sklearn * 1000:9.1f} ms")
+    print(f"ForestArrays.predict          : {t_arrays * 1000:9.1f} ms  ({t_sklearn / t_arrays:.2f}x)")
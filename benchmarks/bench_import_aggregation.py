@@ -0,0 +1,52 @@
+##################################################
+# Benchmark: import cost of 1_Sales_Data_Aggregation
+##################################################
+#
+# Imports the aggregation module in fresh interpreters and checks the
+# median import time against IMPORT_BUDGET_MS, and that pandas (and the
+# pipeline helpers) are not loaded by the import. Run from the project root:
+#
+#   python benchmarks/bench_import_aggregation.py [runs]
+
+import os
+import sys
+import json
+import statistics
+import subprocess
+
+
+IMPORT_BUDGET_MS = 25
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time, json, importlib
+start = time.perf_counter()
+importlib.import_module("1_Sales_Data_Aggregation")
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("pandas", "numpy", "sales_logs", "pyarrow") if m in sys.modules]
+print(json.dumps({"ms": elapsed * 1000, "heavy": heavy}))
+"""
+
+
+def measure(runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(out.stdout))
+    return results
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    results = measure(runs)
+    median_ms = statistics.median(r["ms"] for r in results)
+    heavy = sorted({m for r in results for m in r["heavy"]})
+
+    print(f"import 1_Sales_Data_Aggregation: median {median_ms:.2f} ms over {runs} runs "
+          f"(budget {IMPORT_BUDGET_MS} ms)")
+    print("heavy modules loaded on import:", ", ".join(heavy) or "none")
+    if median_ms > IMPORT_BUDGET_MS or heavy:
+        sys.exit(1)
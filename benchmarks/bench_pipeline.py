@@ -0,0 +1,194 @@
+##################################################
+# Benchmark: full pipeline at several data sizes
+##################################################
+#
+# For each size preset a synthetic dataset is generated (synthetic_data.py)
+# and every stage runs in its own worker process, so that its wall time and
+# peak RSS are measured in isolation:
+#
+#   aggregate_all_logs  run_sales_aggregation(mode="all_logs")
+#   aggregate_chunked   run_sales_aggregation(mode="chunked")
+#   train               trainer feature engineering + RandomForest fit
+#   optimize_score      optimizer candidate grid + demand prediction
+#
+# Results are appended to benchmarks/results/pipeline.csv together with the
+# git revision; a stage that is REGRESSION_FACTOR slower than the median of
+# earlier runs of the same size is reported and makes the run exit 1.
+#
+#   python benchmarks/bench_pipeline.py [--sizes tiny,small] [--keep-data DIR]
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results", "pipeline.csv")
+REGRESSION_FACTOR = 1.3
+
+## stores x products x weeks x transactions per store per day
+SIZES = {
+    "tiny": dict(n_stores=2, n_products=12, n_weeks=2, transactions_per_day=50),
+    "small": dict(n_stores=6, n_products=60, n_weeks=4, transactions_per_day=200),
+    "medium": dict(n_stores=20, n_products=150, n_weeks=8, transactions_per_day=500),
+    "large": dict(n_stores=40, n_products=300, n_weeks=13, transactions_per_day=1000),
+}
+
+PRICE_K = 10
+
+
+##################################################
+# Stages (each runs in a fresh worker process)
+##################################################
+
+def stage_aggregate(data_dir, work_dir, mode):
+    import importlib
+    agg = importlib.import_module("1_Sales_Data_Aggregation")
+    output_file, df_final = agg.run_sales_aggregation(
+        data_dir=data_dir, output_dir=os.path.join(work_dir, "aggregated_sales_data"), mode=mode,
+        spill_dir=os.path.join(work_dir, "spill"),
+    )
+    shutil.copy(output_file, os.path.join(work_dir, "df_sales.csv"))
+    return len(df_final)
+
+
+def _training_features(df_sales):
+    ## mirrors steps 2-4 of 2_Demand_Forecast_Model_Training.py
+    from feature_store import compute_price_features
+
+    df_sales = df_sales.fillna(0)
+    df_sales = df_sales.rename(columns={"DepartmentID": "department_id", "BrandID": "brand_id"})
+    return compute_price_features(df_sales).fillna(0)
+
+
+FEATURES = ["price", "AvgHouseholdIncome", "AvgTraffic", "rl_price", "discount", "department_id", "brand_id"]
+
+
+def stage_train(data_dir, work_dir):
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+
+    df_train = _training_features(pd.read_csv(os.path.join(work_dir, "df_sales.csv")))
+    model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=0, n_jobs=1)
+    model.fit(df_train[FEATURES].values, df_train["sales"].values)
+    joblib.dump(model, os.path.join(work_dir, "model.joblib"))
+    return len(df_train)
+
+
+def candidate_grid(df_sales):
+    ## mirrors section 4.1 of 3_Price_Optimization.py: per (store, department)
+    ## group, price_K candidate prices per product crossed with every
+    ## candidate price_sum
+    from feature_store import price_features
+    from price_grid import candidate_grid as build_grid
+
+    df = df_sales[(df_sales["week_start"] == df_sales["week_start"].max()) & (df_sales["group_val"] == "treatment")]
+    df = df.rename(columns={"DepartmentID": "department_id", "BrandID": "brand_id"}).reset_index(drop=True)
+    grid = build_grid(df, ["week_start", "department_id", "store_id"], PRICE_K)
+    grid["rl_price"], grid["discount"] = price_features(grid["price"], grid["count"], grid["price_sum"], grid["MSRP"])
+    return grid
+
+
+def stage_optimize_score(data_dir, work_dir):
+    ## candidate grid scored with the demand model
+    import joblib
+    import pandas as pd
+
+    model = joblib.load(os.path.join(work_dir, "model.joblib"))
+    grid = candidate_grid(pd.read_csv(os.path.join(work_dir, "df_sales.csv")))
+    model.predict(grid[FEATURES].values)
+    return len(grid)
+
+
+STAGES = [
+    ("aggregate_all_logs", stage_aggregate, {"mode": "all_logs"}),
+    ("aggregate_chunked", stage_aggregate, {"mode": "chunked"}),
+    ("train", stage_train, {}),
+    ("optimize_score", stage_optimize_score, {}),
+]
+
+
+def _timed(func, data_dir, work_dir, kwargs):
+    from run_metrics import peak_rss_mb
+
+    start, cpu = time.perf_counter(), time.process_time()
+    rows = func(data_dir, work_dir, **kwargs)
+    return {
+        "seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - cpu,
+        "peak_rss_mb": peak_rss_mb(),
+        "rows_out": rows,
+    }
+
+
+##################################################
+# Driver
+##################################################
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def run(sizes, keep_data=None):
+    from synthetic_data import generate_dataset
+
+    records = []
+    for size in sizes:
+        base = keep_data or tempfile.mkdtemp(prefix=f"bench_{size}_")
+        data_dir = os.path.join(base, size, "Data Files")
+        work_dir = os.path.join(base, size, "work")
+        os.makedirs(work_dir, exist_ok=True)
+        shape = generate_dataset(data_dir, **SIZES[size])
+        print(f"== {size}: {shape}")
+        for stage, func, kwargs in STAGES:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(_timed, func, data_dir, work_dir, kwargs).result()
+            records.append({"size": size, "stage": stage, "items": shape["items"], **result})
+            print(f"   {stage:<20} {result['seconds']:8.2f} s  cpu {result['cpu_seconds']:8.2f} s  "
+                  f"peak {result['peak_rss_mb']:8.1f} MB  rows {result['rows_out']}")
+        if not keep_data:
+            shutil.rmtree(base, ignore_errors=True)
+    return records
+
+
+def store_and_compare(records):
+    import pandas as pd
+
+    df_new = pd.DataFrame(records).assign(run_at=datetime.now().isoformat(timespec="seconds"), git_rev=_git_rev())
+    regressions = []
+    if os.path.exists(RESULTS_FILE):
+        history = pd.read_csv(RESULTS_FILE)
+        baseline = history.groupby(["size", "stage"])["seconds"].median()
+        for r in df_new.itertuples():
+            base = baseline.get((r.size, r.stage))
+            if base is not None and r.seconds > REGRESSION_FACTOR * base:
+                regressions.append(f"{r.size}/{r.stage}: {r.seconds:.2f} s vs median {base:.2f} s")
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    df_new.to_csv(RESULTS_FILE, mode="a", header=not os.path.exists(RESULTS_FILE), index=False)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline scale benchmark")
+    parser.add_argument("--sizes", default="tiny,small", help=f"comma separated, from {', '.join(SIZES)}")
+    parser.add_argument("--keep-data", help="generate data under this directory and keep it")
+    args = parser.parse_args()
+
+    records = run(args.sizes.split(","), args.keep_data)
+    regressions = store_and_compare(records)
+    print("📁 Results appended to", RESULTS_FILE)
+    for line in regressions:
+        print("⚠️ regression:", line)
+    sys.exit(1 if regressions else 0)
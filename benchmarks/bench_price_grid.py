@@ -0,0 +1,80 @@
+##################################################
+# Benchmark: optimizer candidate grid construction
+##################################################
+#
+# Compares the original row-wise grid of 3_Price_Optimization.py (section
+# 4.1: iterrows list comprehensions, merges and drop_duplicates) with
+# price_grid.candidate_grid on n_groups competing groups of 3 products,
+# and checks both produce the same candidates. Run from the project root:
+#
+#   python benchmarks/bench_price_grid.py [n_groups] [price_K]
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_grid import candidate_grid
+
+GROUP_VARS = ["week_start", "department_id", "store_id"]
+
+
+def make_products(n_groups, per_group=3, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_groups * per_group
+    msrp = np.round(rng.uniform(5, 30, n), 2)
+    return pd.DataFrame({
+        "store_id": np.repeat(np.arange(n_groups) % 50 + 1, per_group),
+        "product_id": [f"{d}_{b}" for d in np.repeat(np.arange(n_groups) // 50 + 1, per_group)
+                       for b in range(1, per_group + 1)][:n],
+        "department_id": np.repeat(np.arange(n_groups) // 50 + 1, per_group),
+        "MSRP": msrp,
+        "Cost": np.round(msrp * rng.uniform(0.35, 0.6, n), 2),
+        "week_start": "2019-01-08",
+    })
+
+
+def legacy_grid(df, price_K):
+    min_cost = df.groupby(GROUP_VARS)["Cost"].agg("min").rename("min_cost").reset_index()
+    max_msrp = df.groupby(GROUP_VARS)["MSRP"].agg("max").rename("max_msrp").reset_index()
+    count = df.groupby(GROUP_VARS)["MSRP"].agg("count").rename("count").reset_index()
+    ranges = df.merge(min_cost, on=GROUP_VARS).merge(max_msrp, on=GROUP_VARS).merge(count, on=GROUP_VARS)
+
+    single = pd.DataFrame(
+        [[pr["week_start"], pr["department_id"], pr["store_id"], pr["count"], i]
+         for _, pr in ranges.iterrows() for i in np.linspace(pr["min_cost"], pr["max_msrp"], price_K).tolist()],
+        columns=GROUP_VARS + ["count", "price"])
+    sums = pd.DataFrame(
+        [[pr["week_start"], pr["department_id"], pr["store_id"], i]
+         for _, pr in ranges.iterrows()
+         for i in np.linspace(pr["count"] * pr["min_cost"], pr["count"] * pr["max_msrp"],
+                              (price_K - 1) * pr["count"] + 1).tolist()],
+        columns=GROUP_VARS + ["price_sum"])
+    grid = single.merge(sums, on=GROUP_VARS).drop_duplicates()
+    return df.merge(grid, on=GROUP_VARS, how="outer").drop_duplicates()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    price_K = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    df = make_products(n_groups)
+    legacy, t_legacy = timed(legacy_grid, df, price_K)
+    grid, t_grid = timed(candidate_grid, df, GROUP_VARS, price_K)
+
+    keys = ["store_id", "department_id", "product_id", "price", "price_sum"]
+    assert legacy[keys].sort_values(keys, ignore_index=True).equals(grid[keys].sort_values(keys, ignore_index=True))
+
+    print(f"{n_groups} groups, {len(df)} products, price_K={price_K}: {len(grid)} candidate rows")
+    print(f"iterrows + merges : {t_legacy * 1000:9.1f} ms")
+    print(f"candidate_grid    : {t_grid * 1000:9.1f} ms  ({t_legacy / t_grid:.0f}x)")
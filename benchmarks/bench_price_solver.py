@@ -0,0 +1,72 @@
+##################################################
+# Benchmark: parallel competing-group solve
+##################################################
+#
+# Times price_solver.solve_groups on n_groups random competing groups of
+# n_products products serially and with 2, 4, ... worker processes up to
+# the core count, checks every worker count returns exactly the serial
+# solutions, and reports the speedup per worker count. Other backends than
+# "dp" are also checked against the DP's best objective per group. Run from
+# the project root:
+#
+#   python benchmarks/bench_price_solver.py [n_groups] [n_products] [price_K] [backend]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_solver import solve_groups, valid_prices
+
+
+def make_tasks(n_groups, n_products, price_K, seed=0):
+    rng = np.random.default_rng(seed)
+    n_targets = (price_K - 1) * n_products + 1
+    tasks = []
+    for _ in range(n_groups):
+        msrp = np.round(rng.uniform(5, 30, n_products), 2)
+        cost = np.round(msrp * rng.uniform(0.35, 0.6, n_products), 2)
+        price = np.linspace(cost.min(), msrp.max(), price_K)
+        margin = price[None, :] - cost[:, None]
+        sales = rng.integers(0, 150, (n_targets, n_products, price_K), dtype=np.int32)
+        price_sum = np.linspace(n_products * price[0], n_products * price[-1], n_targets)
+        tasks.append((margin, sales, valid_prices(np.broadcast_to(price, margin.shape), cost, msrp), price, price_sum))
+    return tasks
+
+
+def same(solutions, reference):
+    return all(
+        np.array_equal(best, ref_best, equal_nan=True) and np.array_equal(choice, ref_choice)
+        for (best, choice), (ref_best, ref_choice) in zip(solutions, reference)
+    )
+
+
+if __name__ == "__main__":
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    n_products = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    price_K = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    backend = sys.argv[4] if len(sys.argv) > 4 else "dp"
+
+    cores = os.cpu_count()
+    tasks = make_tasks(n_groups, n_products, price_K)
+    print(f"{n_groups} groups x {n_products} products, price_K={price_K}, backend {backend}, {cores} cores")
+
+    start = time.perf_counter()
+    reference = solve_groups(tasks, backend, max_workers=1)
+    serial = time.perf_counter() - start
+    print(f"workers  1: {serial:8.2f} s")
+    if backend != "dp":
+        exact = [np.nanmax(best) for best, _ in solve_groups(tasks, "dp")]
+        assert np.allclose([np.nanmax(best) for best, _ in reference], exact), f"{backend} misses the DP optimum"
+
+    workers = 2
+    while workers <= max(cores, 2):
+        start = time.perf_counter()
+        solutions = solve_groups(tasks, backend, max_workers=workers)
+        seconds = time.perf_counter() - start
+        assert same(solutions, reference), f"{workers} workers differ from the serial solve"
+        print(f"workers {workers:2d}: {seconds:8.2f} s  speedup {serial / seconds:4.2f}x")
+        workers *= 2
@@ -0,0 +1,70 @@
+##################################################
+# Benchmark: transaction -> product flattening
+##################################################
+#
+# Compares the original per-transaction iterrows/json_normalize loop of
+# 1_Sales_Data_Aggregation.py (step 4) with sales_logs.flatten_sales_log and
+# with the streaming reader. Run from the project root:
+#
+#   python benchmarks/bench_sales_flatten.py [sales_log.json] [repeats]
+
+import os
+import sys
+import time
+
+import pandas as pd
+from pandas import json_normalize
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sales_logs import flatten_sales_log, iter_sales_log
+
+
+def legacy_flatten(path):
+    df_raw = pd.read_json(path)
+    transactions = json_normalize(df_raw["Transactions"])
+    df_raw = df_raw.drop("Transactions", axis=1).join(transactions)
+    df_raw["TransactionDateTime"] = pd.to_datetime(df_raw["TransactionDateTime"])
+
+    sales_rows = []
+    for _, row in df_raw.iterrows():
+        products = json_normalize(row["Products"])
+        products["store_id"] = row["StoreID"]
+        products["date_date"] = row["TransactionDateTime"]
+        sales_rows.append(products)
+    return pd.concat(sales_rows, ignore_index=True)
+
+
+def stream_rows(path):
+    return sum(1 for _ in iter_sales_log(path))
+
+
+def best_of(func, path, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        "Data Files", "sales_store1_2019_01_02_00_00_00.json"
+    )
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    legacy = legacy_flatten(path)
+    flat = flatten_sales_log(path)
+    assert len(legacy) == len(flat)
+    assert (legacy["ProductID"].values == flat["product_id"].astype(str).values).all()
+    assert (legacy["date_date"].values == flat["date_date"].values).all()
+
+    t_legacy = best_of(legacy_flatten, path, repeats)
+    t_flat = best_of(flatten_sales_log, path, repeats)
+    t_stream = best_of(stream_rows, path, repeats)
+
+    print(f"log: {path} ({len(flat)} sold items)")
+    print(f"iterrows + json_normalize : {t_legacy * 1000:9.1f} ms")
+    print(f"flatten_sales_log         : {t_flat * 1000:9.1f} ms  ({t_legacy / t_flat:.0f}x)")
+    print(f"iter_sales_log (stream)   : {t_stream * 1000:9.1f} ms  ({t_legacy / t_stream:.0f}x)")
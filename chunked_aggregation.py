@@ -0,0 +1,151 @@
+##################################################
+# Out-of-core weekly aggregation
+##################################################
+#
+# Sold-item rows are consumed in bounded batches. Each batch is reduced to
+# (week_start, store_id, product_id) -> (sales, price_sum) and folded into
+# a running partial aggregate; both measures are sums, so partials combine
+# associatively in any order.
+#
+# When the running aggregate grows past memory_limit_mb it is spilled:
+# rows are hash-partitioned by key into n_buckets CSV files and the
+# in-memory aggregate starts empty again. At the end each bucket is reduced
+# on its own, read back in batches, so peak memory is bounded by one batch
+# plus one bucket's aggregate rather than the whole key set (Grace hash
+# aggregation). A bucket whose aggregate still outgrows memory_limit_mb is
+# re-partitioned with another hash seed into n_buckets smaller ones, so the
+# bound holds however many distinct keys there are.
+#
+# Every aggregator spills into a fresh sales_spill_* directory (under
+# spill_dir when given) that result() removes again, so runs never see each
+# other's buckets.
+
+import os
+import shutil
+import tempfile
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+
+KEYS = ["week_start", "store_id", "product_id"]
+## re-partitioning rounds of one bucket before it is reduced regardless of memory_limit_mb
+MAX_DEPTH = 8
+
+
+def _reduce(df):
+    return df.groupby(KEYS, observed=True, sort=False)[["sales", "price_sum"]].sum().reset_index()
+
+
+def _batch_frame(batch, anchor_day):
+    store_ids, times, product_ids, prices = zip(*batch)
+    days = np.array([t[:10] for t in times], dtype="datetime64[D]").astype(np.int64)
+    weeks = anchor_day + 7 * ((days - anchor_day) // 7)
+    return pd.DataFrame({
+        "week_start": weeks,
+        "store_id": np.asarray(store_ids, dtype=np.int64),
+        "product_id": pd.Categorical(product_ids),
+        "sales": np.ones(len(batch), dtype=np.int64),
+        "price_sum": np.asarray(prices, dtype=np.float64),
+    })
+
+
+def _partition(df, directory, n_buckets, depth=0):
+    """Append df's rows to bucket_<b>.csv files in directory by key hash (seeded by depth)."""
+    hash_key = f"{depth:016d}" if depth else "0123456789123456"
+    bucket = pd.util.hash_pandas_object(df[KEYS], index=False, hash_key=hash_key).to_numpy() % n_buckets
+    for b, part in df.groupby(bucket, sort=False):
+        path = os.path.join(directory, f"bucket_{b}.csv")
+        part.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+
+class ChunkedWeeklyAggregator:
+    """Bounded-memory (week, store, product) aggregation of sold-item rows."""
+
+    def __init__(self, anchor, batch_rows=500_000, memory_limit_mb=None, spill_dir=None, n_buckets=16):
+        self.anchor_day = np.datetime64(anchor, "D").astype(np.int64)
+        self.batch_rows = batch_rows
+        self.memory_limit = memory_limit_mb * 2**20 if memory_limit_mb else None
+        self.n_buckets = n_buckets
+        self.spill_root = spill_dir
+        self.spill_dir = None
+        self.spills = 0
+        self.running = None
+
+    def add_rows(self, rows):
+        """Consume an iterable of (store_id, transaction_datetime, product_id, price)."""
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_rows))
+            if not batch:
+                return self
+            self.add_partial(_batch_frame(batch, self.anchor_day))
+
+    def add_partial(self, df):
+        """Fold in any partial aggregate with KEYS + sales + price_sum columns."""
+        df = _reduce(df)
+        self.running = df if self.running is None else _reduce(pd.concat([self.running, df], ignore_index=True))
+        if self.memory_limit and self.running.memory_usage(deep=True).sum() > self.memory_limit:
+            self._spill()
+        return self
+
+    def _spill(self):
+        if self.spill_dir is None:
+            if self.spill_root:
+                os.makedirs(self.spill_root, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix="sales_spill_", dir=self.spill_root)
+        _partition(self.running.assign(product_id=self.running["product_id"].astype(str)), self.spill_dir, self.n_buckets)
+        self.spills += 1
+        self.running = None
+
+    def _reduce_bucket(self, path, depth=0):
+        """Reduced partials of one bucket file, re-partitioning it while its aggregate outgrows memory_limit."""
+        running = None
+        for chunk in pd.read_csv(path, dtype={"product_id": str}, chunksize=self.batch_rows):
+            chunk = _reduce(chunk)
+            running = chunk if running is None else _reduce(pd.concat([running, chunk], ignore_index=True))
+            if (self.memory_limit and depth < MAX_DEPTH
+                    and running.memory_usage(deep=True).sum() > self.memory_limit):
+                break
+        else:
+            return [] if running is None else [running]
+
+        ## too many distinct keys for one pass: split the bucket by another hash seed and reduce the parts
+        running = None
+        sub_dir = path[:-len(".csv")]
+        os.makedirs(sub_dir)
+        for chunk in pd.read_csv(path, dtype={"product_id": str}, chunksize=self.batch_rows):
+            _partition(chunk, sub_dir, self.n_buckets, depth + 1)
+        os.remove(path)
+        return [
+            part for name in sorted(os.listdir(sub_dir))
+            for part in self._reduce_bucket(os.path.join(sub_dir, name), depth + 1)
+        ]
+
+    def result(self):
+        """Final frame: week_start (date), store_id, product_id, sales, price_sum, sorted by key."""
+        if self.spills and self.running is not None:
+            self._spill()
+        if self.spills:
+            try:
+                parts = [
+                    part for b in range(self.n_buckets)
+                    if os.path.exists(os.path.join(self.spill_dir, f"bucket_{b}.csv"))
+                    for part in self._reduce_bucket(os.path.join(self.spill_dir, f"bucket_{b}.csv"))
+                ]
+            finally:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+                self.spill_dir = None
+                self.spills = 0
+        elif self.running is not None:
+            parts = [self.running.assign(product_id=self.running["product_id"].astype(str))]
+        else:
+            parts = []
+        if not parts:
+            return pd.DataFrame(columns=KEYS + ["sales", "price_sum"])
+
+        df = pd.concat(parts, ignore_index=True)
+        df["week_start"] = np.asarray(df["week_start"], dtype=np.int64).astype("datetime64[D]").astype(object)
+        df["product_id"] = df["product_id"].astype(str)
+        return df.sort_values(KEYS, ignore_index=True)[KEYS + ["sales", "price_sum"]]
@@ -0,0 +1,130 @@
+##################################################
+# Shared product / store dimension dictionary
+##################################################
+#
+# products.csv and stores.csv are turned once into dense int32 codes plus
+# fixed attribute arrays indexed by those codes, and persisted as .npz.
+# Every stage then attaches attributes with an array gather
+# (attrs[codes]) instead of a string-keyed pandas merge.
+#
+# Codes are stable: when the CSVs change, known ids keep their code and
+# new ids are appended.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+PRODUCT_ATTRS = {"DepartmentID": np.int32, "BrandID": np.int32, "MSRP": np.float64, "Cost": np.float64}
+STORE_ATTRS = {"AvgHouseholdIncome": np.float64, "AvgTraffic": np.float64, "group_val": str}
+
+
+class Dimensions:
+
+    def __init__(self, product_ids, store_ids, product_attrs, store_attrs):
+        self.product_ids = np.asarray(product_ids).astype(str)
+        self.store_ids = np.asarray(store_ids, dtype=np.int64)
+        self.product_attrs = product_attrs
+        self.store_attrs = store_attrs
+        self._product_index = pd.Index(self.product_ids)
+        self._store_index = pd.Index(self.store_ids)
+
+    @classmethod
+    def from_frames(cls, df_products, df_stores, previous=None):
+        df_products = df_products.assign(ProductID=df_products["ProductID"].astype(str))
+        df_stores = df_stores.assign(StoreID=df_stores["StoreID"].astype(np.int64))
+
+        product_ids = _stable_order(df_products["ProductID"], previous.product_ids if previous else None)
+        store_ids = _stable_order(df_stores["StoreID"], previous.store_ids if previous else None)
+
+        df_products = df_products.set_index("ProductID").reindex(product_ids)
+        df_stores = df_stores.set_index("StoreID").reindex(store_ids)
+        return cls(
+            product_ids,
+            store_ids,
+            {c: _column(df_products[c], t) for c, t in PRODUCT_ATTRS.items()},
+            {c: _column(df_stores[c], t) for c, t in STORE_ATTRS.items()},
+        )
+
+    @classmethod
+    def from_csv(cls, products_loc, stores_loc, previous=None):
+        return cls.from_frames(pd.read_csv(products_loc), pd.read_csv(stores_loc), previous)
+
+    def save(self, path):
+        arrays = {"product_ids": self.product_ids, "store_ids": self.store_ids}
+        arrays.update({"product__" + c: a for c, a in self.product_attrs.items()})
+        arrays.update({"store__" + c: a for c, a in self.store_attrs.items()})
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["product_ids"],
+                data["store_ids"],
+                {c: data["product__" + c] for c in PRODUCT_ATTRS},
+                {c: data["store__" + c] for c in STORE_ATTRS},
+            )
+
+    def product_codes(self, product_ids):
+        """int32 code per product id, -1 for ids not in products.csv."""
+        return self._product_index.get_indexer(np.asarray(product_ids).astype(str)).astype(np.int32)
+
+    def store_codes(self, store_ids):
+        return self._store_index.get_indexer(np.asarray(store_ids, dtype=np.int64)).astype(np.int32)
+
+    def stores_where(self, attr, value):
+        """Store ids whose store attribute equals value (e.g. group_val == 'treatment')."""
+        return self.store_ids[self.store_attrs[attr] == value].tolist()
+
+    def attach(self, df, product_col="product_id", store_col="store_id", attrs=None):
+        """Copy of df with product and store attribute columns gathered by code."""
+        df = df.copy()
+        product_codes = self.product_codes(df[product_col])
+        store_codes = self.store_codes(df[store_col])
+        for table, codes in ((self.product_attrs, product_codes), (self.store_attrs, store_codes)):
+            for col, values in table.items():
+                if attrs is None or col in attrs:
+                    df[col] = _gather(values, codes)
+        return df
+
+
+def load_dimensions(path, products_loc, stores_loc):
+    """Load the persisted dictionary, rebuilding it only when the CSVs are newer."""
+    previous = None
+    if os.path.exists(path):
+        previous = Dimensions.load(path)
+        built = os.path.getmtime(path)
+        if built >= os.path.getmtime(products_loc) and built >= os.path.getmtime(stores_loc):
+            return previous
+    dims = Dimensions.from_csv(products_loc, stores_loc, previous)
+    dims.save(path)
+    return dims
+
+
+def _stable_order(ids, previous_ids):
+    ids = pd.unique(ids)
+    if previous_ids is None:
+        return ids
+    known = set(previous_ids.tolist())
+    return np.concatenate([previous_ids, [i for i in ids if i not in known]]).astype(previous_ids.dtype)
+
+
+def _column(series, dtype):
+    if dtype is str:
+        return series.fillna("").astype(str).to_numpy().astype(str)
+    if np.issubdtype(dtype, np.integer):
+        return series.fillna(-1).to_numpy().astype(dtype)
+    return series.to_numpy(dtype=dtype)
+
+
+def _gather(values, codes):
+    out = values[codes]
+    missing = codes < 0
+    if missing.any():
+        out = out.astype(object if values.dtype.kind == "U" else np.float64)
+        out[missing] = None if values.dtype.kind == "U" else np.nan
+    return out
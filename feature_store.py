@@ -0,0 +1,108 @@
+##################################################
+# Incremental feature store for the demand model
+##################################################
+#
+# rl_price and discount depend only on rows of the same competing group
+# (week_start, store_id, department_id), so a week's features never change
+# once that week's sales are known. The store keeps one file per week,
+#
+#   <root>/features_week_<YYYY-MM-DD>.csv
+#
+# keyed by (week_start, store_id, product_id). A retrain computes features
+# only for weeks that have no file yet and reads the rest back.
+
+import os
+
+import pandas as pd
+
+
+COMPETING_GROUP = ["week_start", "store_id", "department_id"]
+FEATURE_COLUMNS = [
+    "week_start", "store_id", "product_id", "sales", "price", "department_id", "brand_id",
+    "MSRP", "AvgHouseholdIncome", "AvgTraffic", "rl_price", "discount",
+]
+
+
+def price_features(price, count, price_sum, msrp):
+    """(rl_price, discount) for a price within a competing group of count products summing to price_sum.
+
+    Shared by training (observed prices) and the optimizer (candidate prices).
+    """
+    rl_price = price * count / price_sum
+    discount = msrp - price / msrp
+    return rl_price, discount
+
+
+def compute_price_features(df_sales):
+    """Add rl_price / discount to cleaned weekly sales in one grouped pass.
+
+    df_sales needs week_start, store_id, department_id, price and MSRP; the
+    group's price sum and count are broadcast back with transform, not merges.
+    """
+    grouped = df_sales.groupby(COMPETING_GROUP, observed=True, sort=False)["price"]
+    df = df_sales.copy()
+    df["rl_price"], df["discount"] = price_features(
+        df["price"], grouped.transform("count"), grouped.transform("sum"), df["MSRP"]
+    )
+    return df
+
+
+class FeatureStore:
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, week):
+        return os.path.join(self.root, f"features_week_{week}.csv")
+
+    def weeks(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name[len("features_week_"):-len(".csv")]
+            for name in os.listdir(self.root)
+            if name.startswith("features_week_") and name.endswith(".csv")
+        )
+
+    def missing_weeks(self, weeks):
+        stored = set(self.weeks())
+        return sorted({str(w) for w in weeks} - stored)
+
+    def add(self, df_sales):
+        """Compute and store features for every week in df_sales; returns the weeks written."""
+        if df_sales.empty:
+            return []
+        os.makedirs(self.root, exist_ok=True)
+        df = compute_price_features(df_sales)
+        df["week_start"] = df["week_start"].astype(str)
+        written = []
+        for week, df_week in df.groupby("week_start", sort=True):
+            tmp = self._path(week) + ".tmp"
+            df_week[FEATURE_COLUMNS].to_csv(tmp, index=False)
+            os.replace(tmp, self._path(week))
+            written.append(week)
+        return written
+
+    def pending_weeks(self, weeks):
+        """Weeks to (re)compute: those not stored yet, plus the latest stored
+        week when it is among them, since it may have been stored while that
+        week's logs were still arriving."""
+        stored = self.weeks()
+        pending = set(self.missing_weeks(weeks))
+        if stored and stored[-1] in {str(w) for w in weeks}:
+            pending.add(stored[-1])
+        return sorted(pending)
+
+    def update(self, df_sales):
+        """Store features for the pending weeks of df_sales only."""
+        weeks = df_sales["week_start"].astype(str)
+        return self.add(df_sales[weeks.isin(self.pending_weeks(weeks.unique()))])
+
+    def read(self, weeks=None, columns=None):
+        weeks = self.weeks() if weeks is None else [str(w) for w in weeks]
+        frames = [
+            pd.read_csv(self._path(w), usecols=columns, dtype={"product_id": str}) for w in weeks
+        ]
+        if not frames:
+            return pd.DataFrame(columns=columns or FEATURE_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,105 @@
+##################################################
+# Array-backed random forest predictor
+##################################################
+#
+# ForestArrays flattens every tree of a fitted RandomForestRegressor into
+# one set of contiguous node arrays
+#
+#   feature[n], threshold[n], value[n]
+#   children[2n], children[2n + 1]   left / right child of node n
+#
+# (tree t's nodes start at offsets[t]; leaves point to themselves). A batch
+# of rows descends a tree with one vectorised gather per level. The arrays
+# load without sklearn or unpickling, and can be shared between processes.
+#
+# sklearn's own predict is compiled as well and still walks each row only
+# to its leaf, so on one core it stays faster than this level-synchronous
+# descent (benchmarks/bench_forest_predict.py); the optimizer keeps using it.
+#
+# Rows are compared as float32 like sklearn does, and tree outputs are summed
+# in tree order before dividing by the tree count, so predictions are
+# identical to RandomForestRegressor.predict.
+
+import numpy as np
+
+
+ARRAY_NAMES = ("feature", "threshold", "children", "value", "offsets", "depths")
+
+
+class ForestArrays:
+
+    def __init__(self, feature, threshold, children, value, offsets, depths):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.offsets = offsets
+        self.depths = depths
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten a fitted single-output RandomForestRegressor."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        sizes = np.array([tree.node_count for tree in trees], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+        feature, threshold, children, value = [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count, dtype=np.int64) + offset
+            is_leaf = tree.children_left == -1
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            pairs = np.empty((tree.node_count, 2), dtype=np.int64)
+            pairs[:, 0] = np.where(is_leaf, nodes, tree.children_left + offset)
+            pairs[:, 1] = np.where(is_leaf, nodes, tree.children_right + offset)
+            children.append(pairs.ravel())
+            value.append(tree.value[:, 0, 0])
+        return cls(
+            np.concatenate(feature).astype(np.int64),
+            np.concatenate(threshold).astype(np.float64),
+            np.concatenate(children),
+            np.concatenate(value).astype(np.float64),
+            offsets,
+            np.array([tree.max_depth for tree in trees], dtype=np.int64),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.offsets)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(**{name: arrays[name] for name in ARRAY_NAMES})
+
+    def save(self, path):
+        np.savez(path, **self.arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls.from_arrays(arrays)
+
+    def _leaves(self, flat_X, row_base, tree):
+        nodes = np.full(len(row_base), self.offsets[tree], dtype=np.int64)
+        for _ in range(self.depths[tree]):
+            go_left = np.take(flat_X, row_base + np.take(self.feature, nodes)) <= np.take(self.threshold, nodes)
+            nodes = np.take(self.children, 2 * nodes + 1 - go_left)
+        return nodes
+
+    def predict(self, X, batch_rows=65_536):
+        """Mean tree output per row, identical to RandomForestRegressor.predict."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        out = np.empty(n_rows, dtype=np.float64)
+        for start in range(0, n_rows, batch_rows):
+            batch = X[start:start + batch_rows]
+            flat_X = batch.ravel()
+            row_base = np.arange(len(batch), dtype=np.int64) * n_features
+            total = np.zeros(len(batch), dtype=np.float64)
+            for tree in range(self.n_trees):
+                total += np.take(self.value, self._leaves(flat_X, row_base, tree))
+            out[start:start + batch_rows] = total / self.n_trees
+        return out
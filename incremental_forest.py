@@ -0,0 +1,86 @@
+##################################################
+# Warm-start retraining for the demand forest
+##################################################
+#
+# A full refit rebuilds every tree on the whole history, so retraining gets
+# slower every week. grow_forest() instead fits a few new trees on the
+# recent weeks only and adds them to the previous model, dropping its
+# oldest trees once max_trees is reached. Retrain cost then depends on the
+# size of the recent window, not on the length of the history, and old
+# weeks age out of the model as their trees are dropped.
+#
+# drift_vs_full_refit() reports the loss in accuracy against a full refit
+# without paying for one on the whole history: the latest holdout_weeks are
+# set aside, an incremental retrain and a reference forest (the validated
+# parameters, on a bounded sample) are both fitted on the weeks before
+# them, and both are scored on the held-out weeks.
+
+import numpy as np
+from sklearn import metrics
+from sklearn.ensemble import RandomForestRegressor
+
+
+NEW_TREES = 20
+MAX_TREES = 100
+RECENT_WEEKS = 4
+DRIFT_SAMPLE_ROWS = 200_000
+HOLDOUT_WEEKS = 1
+
+
+def recent_weeks(weeks, trained_until=None, n_recent=RECENT_WEEKS):
+    """Weeks the new trees are fitted on: every week after trained_until and at least the last n_recent."""
+    weeks = sorted({str(w) for w in weeks})
+    new = [w for w in weeks if trained_until is None or w > str(trained_until)]
+    return sorted(set(new) | set(weeks[-n_recent:]))
+
+
+def grow_forest(previous, X_recent, y_recent, n_new_trees=NEW_TREES, max_trees=MAX_TREES, random_state=0):
+    """previous's newest trees plus n_new_trees fitted on (X_recent, y_recent), at most max_trees in all.
+
+    random_state should change from cycle to cycle so new trees differ from
+    the ones fitted on overlapping weeks before. max_trees is normally the
+    n_estimators of the last full fit.
+    """
+    model = RandomForestRegressor(
+        n_estimators=n_new_trees, max_depth=previous.max_depth, random_state=random_state
+    )
+    model.fit(X_recent, y_recent)
+    n_keep = max(0, max_trees - n_new_trees)
+    kept = previous.estimators_[len(previous.estimators_) - n_keep:] if n_keep else []
+    model.estimators_ = list(kept) + model.estimators_
+    model.n_estimators = len(model.estimators_)
+    return model
+
+
+def drift_vs_full_refit(previous, X, y, weeks, rf_params, trained_until=None, holdout_weeks=HOLDOUT_WEEKS,
+                        sample_rows=DRIFT_SAMPLE_ROWS, random_state=0):
+    """Held-out RMSE/R2 of a full refit with rf_params and RMSE_drift of an incremental retrain of previous.
+
+    Both models are fitted without the last holdout_weeks of weeks (the
+    reference on at most sample_rows rows of the history) and scored on
+    them; RMSE_drift > 0 is the accuracy given up by retraining incrementally.
+    All None when no history precedes the held-out weeks or previous was
+    trained on them already.
+    """
+    weeks = np.asarray(weeks).astype(str)
+    held_out = sorted(set(weeks))[-holdout_weeks:]
+    test = np.isin(weeks, held_out)
+    ## nothing left to fit on, or previous was already trained on the held-out weeks
+    if test.all() or (trained_until is not None and str(trained_until) >= held_out[0]):
+        return {"RMSE_full_refit": None, "R2_full_refit": None, "RMSE_drift": None}
+    train = np.flatnonzero(~test)
+    recent = train[np.isin(weeks[train], recent_weeks(weeks[train], trained_until))]
+    if len(train) > sample_rows:
+        train = np.sort(np.random.default_rng(random_state).choice(train, sample_rows, replace=False))
+
+    reference = RandomForestRegressor(random_state=random_state, **rf_params)
+    reference.fit(X[train], y[train])
+    incremental = grow_forest(previous, X[recent], y[recent], max_trees=rf_params['n_estimators'], random_state=random_state)
+    reference_predictions = reference.predict(X[test])
+    rmse = np.sqrt(metrics.mean_squared_error(y[test], incremental.predict(X[test])))
+    rmse_full = np.sqrt(metrics.mean_squared_error(y[test], reference_predictions))
+    return {
+        "RMSE_full_refit": rmse_full,
+        "R2_full_refit": metrics.r2_score(y[test], reference_predictions),
+        "RMSE_drift": rmse - rmse_full,
+    }
@@ -0,0 +1,137 @@
+##################################################
+# Model registry
+##################################################
+#
+# Each trained forest is stored under its version name
+#
+#   <root>/<version>/model.joblib         sklearn model, uncompressed
+#   <root>/<version>/arrays/<name>.npy    flattened node arrays (forest_arrays.py)
+#
+# and described by one JSON line per registration in <root>/manifest.jsonl:
+#
+#   {"version": .., "trained_until": .., "training_window": .., "features": ..,
+#    "metrics": .., "n_trees": .., "size_bytes": .., "created_at": .., ...}
+#
+# The manifest is append-only (append_log.py): the last line is the latest
+# model and is read from the end of the file, and manifest() indexes all
+# entries by version, a later registration of a version replacing earlier ones.
+#
+# Payloads are written uncompressed so they can be opened with
+# mmap_mode="r": the .npy node arrays are then pages of the file itself, and
+# several optimizer or dashboard processes on one host share one copy of
+# them through the page cache. (sklearn copies tree nodes out of the
+# mapping when it unpickles a model, so load_model saves the read and
+# decompression but each process still holds its own trees.)
+#
+# The payload directory is written to a temporary name and renamed into place
+# before its manifest line is appended, so readers never see a half-written model.
+
+import os
+import json
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from append_log import append_line, last_line
+from forest_arrays import ARRAY_NAMES, ForestArrays
+
+
+def _plain(value):
+    ## numpy scalars -> JSON numbers
+    return value.item() if hasattr(value, "item") else value
+
+
+class ModelRegistry:
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest_file = os.path.join(root, "manifest.jsonl")
+
+    def manifest(self):
+        """{"latest": version, "models": {version: entry}} over the whole manifest."""
+        models, latest = {}, None
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file) as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    entry = json.loads(line)
+                    models.pop(entry["version"], None)
+                    models[entry["version"]] = latest = entry
+        return {"latest": latest and latest["version"], "models": models}
+
+    def _latest_entry(self):
+        found = last_line(self.manifest_file)
+        return json.loads(found[1]) if found else None
+
+    def versions(self):
+        return list(self.manifest()["models"])
+
+    def latest(self):
+        entry = self._latest_entry()
+        return entry and entry["version"]
+
+    def entry(self, version=None):
+        entry = self._latest_entry()
+        if version is not None and (entry is None or entry["version"] != version):
+            entry = self.manifest()["models"].get(version)
+        if entry is None:
+            raise KeyError(f"model {version or 'latest'!r} is not registered in {self.manifest_file}")
+        return entry
+
+    def path(self, version=None):
+        """Full path of the sklearn model file of version (default: latest)."""
+        return os.path.join(self.root, self.entry(version)["model_file"])
+
+    def register(self, version, model, **metadata):
+        """Store model as version (replacing an earlier one of that name), append it as latest and return its entry.
+
+        metadata (training window, features, metrics, ...) is kept in the manifest as is.
+        """
+        import joblib
+
+        os.makedirs(self.root, exist_ok=True)
+        final_dir = os.path.join(self.root, version)
+        tmp_dir = final_dir + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(os.path.join(tmp_dir, "arrays"))
+
+        joblib.dump(model, os.path.join(tmp_dir, "model.joblib"), compress=0)
+        for name, array in ForestArrays.from_sklearn(model).arrays().items():
+            np.save(os.path.join(tmp_dir, "arrays", f"{name}.npy"), array)
+        size_bytes = sum(
+            os.path.getsize(os.path.join(folder, name))
+            for folder, _, names in os.walk(tmp_dir) for name in names
+        )
+
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+
+        entry = {key: _plain(value) for key, value in metadata.items()}
+        if isinstance(entry.get("metrics"), dict):
+            entry["metrics"] = {key: _plain(value) for key, value in entry["metrics"].items()}
+        entry.update({
+            "version": version,
+            ## relative to root, so the registry can be moved or mounted elsewhere
+            "model_file": os.path.join(version, "model.joblib"),
+            "arrays_dir": os.path.join(version, "arrays"),
+            "n_trees": len(model.estimators_),
+            "size_bytes": size_bytes,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        append_line(self.manifest_file, json.dumps(entry, sort_keys=True))
+        return entry
+
+    def load_model(self, version=None, mmap_mode="r"):
+        """The sklearn model of version (default: latest)."""
+        import joblib
+
+        return joblib.load(self.path(version), mmap_mode=mmap_mode)
+
+    def load_forest(self, version=None, mmap_mode="r"):
+        """ForestArrays of version (default: latest), memory-mapped from the registry by default."""
+        arrays_dir = os.path.join(self.root, self.entry(version)["arrays_dir"])
+        return ForestArrays.from_arrays({
+            name: np.load(os.path.join(arrays_dir, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_NAMES
+        })
@@ -0,0 +1,138 @@
+##################################################
+# Walk-forward validation and parameter search
+##################################################
+#
+# The trainers used to score the forest on its own training rows. Here each
+# candidate (n_estimators, max_depth) is scored out of sample on
+# time-ordered folds: fold k trains on every week before its test weeks and
+# tests on the next `horizon` weeks, the way the model is used to forecast
+# the coming week.
+#
+#   weeks:   w1 w2 w3 w4 w5 w6
+#   fold 1:  [train  ] test
+#   fold 2:  [train     ] test
+#   fold 3:  [train        ] test
+#
+# Every (candidate, fold) pair is an independent task run in a process
+# pool. X, y and the week labels are sent once per worker through the pool
+# initializer, not once per task, and each forest is fitted single-threaded
+# so the pool is what uses the cores. Tasks not started when time_budget_s
+# runs out are cancelled, so the search fits in the weekly window; only
+# candidates scored on every fold are ranked, so a candidate cut short by
+# the budget is never compared on a different set of folds.
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn import metrics
+from sklearn.ensemble import RandomForestRegressor
+
+
+PARAM_GRID = {"n_estimators": [50, 100, 200], "max_depth": [6, 10, 14]}
+N_FOLDS = 4
+MIN_TRAIN_WEEKS = 2
+
+
+def walk_forward_folds(weeks, n_folds=N_FOLDS, min_train_weeks=MIN_TRAIN_WEEKS, horizon=1):
+    """(train_weeks, test_weeks) for the last n_folds forecast origins, oldest first."""
+    weeks = sorted({str(w) for w in weeks})
+    folds = []
+    for end in range(len(weeks) - horizon, min_train_weeks - 1, -horizon):
+        folds.append((weeks[:end], weeks[end:end + horizon]))
+        if len(folds) == n_folds:
+            break
+    return folds[::-1]
+
+
+def param_candidates(param_grid=PARAM_GRID):
+    names = sorted(param_grid)
+    return [dict(zip(names, values)) for values in product(*(param_grid[n] for n in names))]
+
+
+_X = _y = _weeks = None
+
+
+def _init_worker(X, y, weeks):
+    global _X, _y, _weeks
+    _X, _y, _weeks = X, y, weeks
+
+
+def _score_fold(candidate_id, params, fold, train_weeks, test_weeks, random_state=0):
+    train = np.isin(_weeks, train_weeks)
+    test = np.isin(_weeks, test_weeks)
+    start, cpu = time.perf_counter(), time.process_time()
+    model = RandomForestRegressor(random_state=random_state, n_jobs=1, **params)
+    model.fit(_X[train], _y[train])
+    fit_seconds = time.perf_counter() - start
+    predictions = model.predict(_X[test])
+    return {
+        "candidate": candidate_id, **params, "fold": fold,
+        "train_until": train_weeks[-1], "test_weeks": ",".join(test_weeks),
+        "train_rows": int(train.sum()), "test_rows": int(test.sum()),
+        "RMSE": np.sqrt(metrics.mean_squared_error(_y[test], predictions)),
+        "R2": metrics.r2_score(_y[test], predictions) if test.sum() > 1 else np.nan,
+        "fit_seconds": fit_seconds,
+        "predict_seconds": time.perf_counter() - start - fit_seconds,
+        "cpu_seconds": time.process_time() - cpu,
+    }
+
+
+def walk_forward_search(X, y, weeks, param_grid=PARAM_GRID, n_folds=N_FOLDS, min_train_weeks=MIN_TRAIN_WEEKS,
+                        horizon=1, max_workers=None, time_budget_s=None):
+    """Score every candidate of param_grid on every walk-forward fold.
+
+    weeks holds the week_start of each row of X. Returns (df_folds, df_summary):
+    one row per (candidate, fold) with metrics and timings, and per-candidate
+    mean RMSE/R2 of the candidates that completed every fold, best (lowest
+    RMSE) first. Both are empty when there are too few weeks for a single
+    fold; df_summary is also empty when no candidate completed every fold.
+    """
+    weeks = np.asarray([str(w) for w in weeks])
+    folds = walk_forward_folds(weeks, n_folds, min_train_weeks, horizon)
+    candidates = param_candidates(param_grid)
+    tasks = [
+        (candidate_id, params, fold, train_weeks, test_weeks)
+        for candidate_id, params in enumerate(candidates)
+        for fold, (train_weeks, test_weeks) in enumerate(folds)
+    ]
+
+    records = []
+    if tasks:
+        deadline = time.monotonic() + time_budget_s if time_budget_s else None
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(X, y, weeks)) as pool:
+            pending = {pool.submit(_score_fold, *task) for task in tasks}
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                records.extend(future.result() for future in done)
+                if deadline is not None and time.monotonic() >= deadline:
+                    ## tasks already running finish, queued ones are dropped
+                    for future in pending:
+                        future.cancel()
+                    records.extend(f.result() for f in pending if not f.cancelled())
+                    break
+
+    df_folds = pd.DataFrame(records)
+    if df_folds.empty:
+        return df_folds, df_folds
+    df_folds = df_folds.sort_values(["candidate", "fold"], ignore_index=True)
+    df_summary = (
+        df_folds.groupby(["candidate"] + sorted(param_grid))
+        .agg(RMSE=("RMSE", "mean"), R2=("R2", "mean"), folds=("fold", "count"),
+             fit_seconds=("fit_seconds", "sum"))
+        .reset_index()
+    )
+    df_summary = df_summary[df_summary["folds"] == len(folds)].sort_values(["RMSE", "candidate"], ignore_index=True)
+    return df_folds, df_summary
+
+
+def best_params(df_summary, default):
+    """Parameters of the best candidate, or default when no candidate was scored on every fold."""
+    if df_summary.empty:
+        return dict(default)
+    best = df_summary.iloc[0]
+    return {name: int(best[name]) for name in default}
@@ -0,0 +1,116 @@
+##################################################
+# Memoised demand predictions
+##################################################
+#
+# PredictionCache.predict(model, X) scores each distinct feature row of X
+# once. Rows are compared as the float32 values the forest splits on, so
+# rows that only differ below float32 precision share a prediction too.
+#
+# With a store directory, predictions also persist between runs in
+#
+#   <store_dir>/predictions_<model_version>.npz   (keys, values, last_used, fingerprint)
+#
+# one file per model version. A version name does not pin one model (the
+# registry replaces a version when it is registered again, and retrains
+# within a cycle reuse the name), so the file also records the fingerprint
+# of the model it was filled with (model_fingerprint: a content hash of the
+# model file) and a store written for another fingerprint is discarded on
+# load. The store is a least-recently-used cache: save() keeps the
+# max_entries rows used most recently (last_used is a run counter).
+
+import os
+import hashlib
+
+import numpy as np
+
+
+def model_fingerprint(path, block=2**20):
+    """SHA-256 of the model file at path, changes whenever the model does."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+
+    def __init__(self, model_version, store_dir=None, max_entries=1_000_000, fingerprint=""):
+        self.model_version = str(model_version)
+        self.fingerprint = str(fingerprint)
+        self.store_dir = store_dir
+        self.max_entries = max_entries
+        self.run = 1
+        self._entries = {}
+        self.stats = {"rows": 0, "unique_rows": 0, "store_hits": 0, "predicted_rows": 0, "predict_calls": 0}
+        if store_dir:
+            self._load()
+
+    @property
+    def path(self):
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.model_version)
+        return os.path.join(self.store_dir, f"predictions_{safe}.npz")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with np.load(self.path) as stored:
+            if "fingerprint" not in stored or str(stored["fingerprint"]) != self.fingerprint:
+                ## filled by another model under the same version name
+                return
+            keys, values, last_used = stored["keys"], stored["values"], stored["last_used"]
+        self.run = int(last_used.max()) + 1 if len(last_used) else 1
+        self._entries = {
+            key.tobytes(): (value, used) for key, value, used in zip(keys, values.tolist(), last_used.tolist())
+        }
+
+    def predict(self, model, X):
+        """model.predict(X), calling it once on the rows not seen before."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        rows = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+        unique, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+        keys = unique.tolist()
+        values = np.empty(len(unique), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            found = self._entries.get(key)
+            if found is None:
+                missing.append(i)
+            else:
+                values[i] = found[0]
+                self._entries[key] = (found[0], self.run)
+        if missing:
+            missing = np.asarray(missing)
+            values[missing] = model.predict(X[first[missing]])
+            self.stats["predict_calls"] += 1
+            for i in missing.tolist():
+                self._entries[keys[i]] = (values[i], self.run)
+
+        self.stats["rows"] += len(X)
+        self.stats["unique_rows"] += len(unique)
+        self.stats["store_hits"] += len(unique) - len(missing)
+        self.stats["predicted_rows"] += len(missing)
+        return values[inverse.ravel()]
+
+    def report(self):
+        """Stats plus hit_rate: the share of rows answered without scoring them."""
+        rows = self.stats["rows"]
+        return dict(self.stats, hit_rate=1 - self.stats["predicted_rows"] / rows if rows else 0.0)
+
+    def save(self):
+        """Write the most recently used max_entries predictions to the store."""
+        if not self.store_dir or not self._entries:
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        items = sorted(self._entries.items(), key=lambda item: item[1][1], reverse=True)[:self.max_entries]
+        width = len(items[0][0]) // np.dtype(np.float32).itemsize
+        keys = np.frombuffer(b"".join(key for key, _ in items), dtype=np.float32).reshape(-1, width)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, keys=keys, fingerprint=np.array(self.fingerprint),
+                values=np.array([value for _, (value, _) in items], dtype=np.float64),
+                last_used=np.array([used for _, (_, used) in items], dtype=np.int64),
+            )
+        os.replace(tmp, self.path)
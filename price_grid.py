@@ -0,0 +1,71 @@
+##################################################
+# Candidate price grid for the optimizer
+##################################################
+#
+# Every product of a competing group (week_start, department_id, store_id)
+# gets the same price_K candidate prices, evenly spaced from the group's
+# lowest Cost to its highest MSRP, and every candidate price_sum of the
+# group: the (price_K - 1) * count + 1 evenly spaced totals count products
+# can reach on that price grid. The grid is
+#
+#   product x candidate price x candidate price_sum
+#
+# built with repeat/arange arithmetic on group codes, one block of
+# price_K * n_sums rows per product, instead of per-row Python lists, merges
+# and drop_duplicates. Values are computed the way np.linspace computes
+# them, so they are exactly the candidates the row-wise version produced.
+#
+# With df sorted by group, the grid is sorted by group too and each group's
+# candidates are one contiguous slice, found with group_offsets; group_block
+# views a slice as (product, price, price_sum) without copying, so solvers
+# read a group with two offsets instead of grouping rows by key.
+
+import numpy as np
+
+
+def _linspace_at(start, stop, num, k):
+    """Element k of np.linspace(start, stop, num), elementwise over arrays."""
+    div = np.maximum(num - 1, 1)
+    values = k * ((stop - start) / div) + start
+    return np.where(k == num - 1, stop, values)
+
+
+def candidate_grid(df, group_vars, price_K):
+    """df (one row per product) crossed with its group's candidate prices and price_sums.
+
+    Returns df's columns plus count, price and price_sum, one block of
+    rows per product: prices ascending, price_sum ascending within a price.
+    """
+    grouped = df.groupby(group_vars, observed=True, sort=False)
+    codes = grouped.ngroup().to_numpy()
+    min_cost = grouped["Cost"].min().to_numpy()[codes]
+    max_msrp = grouped["MSRP"].max().to_numpy()[codes]
+    count = grouped["MSRP"].count().to_numpy()[codes]
+
+    n_sums = (price_K - 1) * count + 1
+    block = price_K * n_sums
+    rows = np.repeat(np.arange(len(df)), block)
+    ## position inside each product's block -> (price index, price_sum index)
+    offset = np.arange(len(rows)) - np.repeat(np.cumsum(block) - block, block)
+    k_price, k_sum = np.divmod(offset, n_sums[rows])
+
+    grid = df.iloc[rows].reset_index(drop=True)
+    grid["count"] = count[rows]
+    grid["price"] = _linspace_at(min_cost[rows], max_msrp[rows], price_K, k_price)
+    grid["price_sum"] = _linspace_at(
+        count[rows] * min_cost[rows], count[rows] * max_msrp[rows], n_sums[rows], k_sum
+    )
+    return grid
+
+
+def group_offsets(codes):
+    """Boundaries of the runs of equal codes: run g is rows offsets[g]:offsets[g + 1]."""
+    codes = np.asarray(codes)
+    if not len(codes):
+        return np.zeros(1, dtype=np.int64)
+    return np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1, [len(codes)]))
+
+
+def group_block(values, start, end, count, price_K):
+    """values[start:end] of one group's candidates as a (count, price_K, n_sums) view."""
+    return values[start:end].reshape(count, price_K, -1)
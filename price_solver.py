@@ -0,0 +1,299 @@
+##################################################
+# Exact price selection for a competing group
+##################################################
+#
+# For one competing group (week_start, department_id, store_id) the optimizer
+# picks one of the price_K candidate prices for each of its n products so that
+# the prices add up to a candidate price_sum, maximising
+#
+#   sum_i (price_ik - cost_i) * max(0, round(predicted demand_ik))
+#
+# a multiple-choice knapsack. The candidate grid (price_grid.py) makes it a
+# small one: prices are price_k = min_cost + k * step and the candidate totals
+# are price_sum_t = n * min_cost + t * step, so a choice of price indices k_i
+# meets target t exactly when sum_i k_i == t. A dynamic program over that index
+# sum (0 .. (price_K - 1) * n) then solves every target of the group in one
+# pass, instead of one integer program per (group, price_sum).
+#
+# The demand predictions depend on price_sum (through rl_price), so the
+# objective is obj[t, i, k]; the DP runs for all targets at once, vectorised
+# over t, and keeps the chosen price index per state to read the solutions
+# back. Ties between equally good choices go to the lower price index.
+#
+# Groups are independent, so solve_groups can spread them over worker
+# processes. A group travels as a compact task of plain arrays
+#
+#   (margin (n, price_K) float64, sales (n_targets, n, price_K) int32,
+#    valid (n, price_K) bool, price (price_K,) float64, price_sum (n_targets,) float64)
+#
+# and the objective margin * sales is formed in the solving process, the same
+# way in serial and parallel mode; results come back in task order.
+#
+# The solving itself is done by a backend (BACKENDS), each returning
+# (best, choice) as solve_group does, with nan for targets it did not solve:
+#
+#   "dp"      solve_group, every target
+#   "milp"    one mixed-integer program per group over (price_sum, product,
+#             price) binaries that also picks the price_sum, solved with the
+#             HiGHS MILP solver shipped in SciPy; only the best target
+#   "gurobi"  one Gurobi integer program per target, needs a Gurobi license
+#
+# A backend can be warm-started with the previous week's price index per
+# product of the group (None when there is none).
+
+import os
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def valid_prices(price, cost, msrp):
+    """(n, price_K) bool: which candidate prices product i may take.
+
+    Prices between cost and MSRP are valid. A product none of whose first
+    price_K - 1 candidates is valid gets the candidate closest to its MSRP
+    (the first one on ties), the same rule the integer program applies.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    cost = np.asarray(cost, dtype=np.float64)[:, None]
+    msrp = np.asarray(msrp, dtype=np.float64)[:, None]
+    valid = (price >= cost) & (price <= msrp)
+    stuck = ~valid[:, :-1].any(axis=1)
+    closest = np.abs(msrp - price).argmin(axis=1)
+    valid[stuck, closest[stuck]] = True
+    return valid
+
+
+def cap_price_changes(valid, price, previous, max_change):
+    """valid restricted to prices within max_change (a fraction) of each product's previous price.
+
+    previous[i] is nan for products without one, which stay unrestricted. A
+    product with no valid price inside the cap keeps its valid price closest
+    to the previous one, so a capped group never becomes infeasible.
+    """
+    previous = np.asarray(previous, dtype=np.float64)[:, None]
+    distance = np.abs(np.asarray(price, dtype=np.float64)[None, :] - previous)
+    capped = valid & ((distance <= max_change * previous) | np.isnan(previous))
+    stuck = ~capped.any(axis=1)
+    closest = np.where(valid, distance, np.inf).argmin(axis=1)
+    capped[stuck, closest[stuck]] = True
+    return capped
+
+
+def solve_group(obj, valid, price, max_cells=2**25):
+    """Best choice of price per product for every price_sum target of one group.
+
+    obj[t, i, k] is the objective of product i at candidate price k when the
+    group total is target t, valid[i, k] comes from valid_prices, price holds
+    the price_K candidate prices. Targets are the (price_K - 1) * n + 1
+    candidate price_sums in ascending order.
+
+    Returns (best, choice): best[t] is the optimal objective of target t (nan
+    when no valid choice meets it) and choice[t, i] the chosen price index.
+    max_cells bounds the size of the back-pointer table; targets are solved
+    in chunks to stay below it.
+    """
+    n_targets, n, price_K = obj.shape
+    best = np.full(n_targets, np.nan)
+    choice = np.zeros((n_targets, n), dtype=np.int64)
+    if price[-1] == price[0]:
+        ## all candidate prices equal: every choice meets every target
+        masked = np.where(valid, obj, -np.inf)
+        choice[:] = masked.argmax(axis=2)
+        best[:] = masked.max(axis=2).sum(axis=1)
+        best[~np.isfinite(best)] = np.nan
+        return best, choice
+
+    chunk = max(1, int(np.sqrt(max_cells / max(n, 1))))
+    for t0 in range(0, n_targets, chunk):
+        targets = np.arange(t0, min(t0 + chunk, n_targets))
+        ## index sums above the largest target of the chunk can never come back down
+        width = targets[-1] + 1
+        value = np.full((len(targets), width), -np.inf)
+        value[:, 0] = 0.0
+        back = np.zeros((n, len(targets), width), dtype=np.int8 if price_K <= 127 else np.int16)
+        for i in range(n):
+            reach = min(width, (price_K - 1) * (i + 1) + 1)
+            new = np.full_like(value, -np.inf)
+            for k in np.flatnonzero(valid[i]):
+                if k >= reach:
+                    break
+                candidate = value[:, :reach - k] + obj[targets, i, k][:, None]
+                better = candidate > new[:, k:reach]
+                new[:, k:reach][better] = candidate[better]
+                back[i, :, k:reach][better] = k
+            value = new
+
+        found = value[np.arange(len(targets)), targets]
+        ok = np.isfinite(found)
+        best[targets[ok]] = found[ok]
+        state = targets.copy()
+        for i in range(n - 1, -1, -1):
+            k = back[i, np.arange(len(targets)), state]
+            choice[targets, i] = k
+            state = state - k
+    return best, choice
+
+
+def _objective(task):
+    margin, sales = task[0], task[1]
+    return margin[None] * sales
+
+
+def _warm_target(obj, valid, warm_start):
+    """(target, objective) of a previous choice of price indices, None if it is not allowed any more."""
+    if warm_start is None:
+        return None
+    warm_start = np.asarray(warm_start)
+    if len(warm_start) != obj.shape[1] or not valid[np.arange(len(warm_start)), warm_start].all():
+        return None
+    target = int(warm_start.sum())
+    return target, obj[target, np.arange(len(warm_start)), warm_start].sum()
+
+
+class DPBackend:
+    """Every price_sum target of a group by dynamic programming (solve_group); needs no warm start."""
+
+    name = "dp"
+
+    def solve(self, task, warm_start=None):
+        return solve_group(_objective(task), task[2], task[3])
+
+
+class MILPBackend:
+    """One scipy.optimize.milp (HiGHS) model per group, price_sum choice included.
+
+    Binaries x[t, i, k] (product i at price k under target t) and y[t]
+    (target t chosen): one target, one valid price per product of it, and
+    price indices summing to the target. SciPy's milp takes no starting
+    solution, so a warm start is kept as the incumbent: with a time_limit,
+    a search stopped early returns the previous week's prices (when they
+    are still allowed) unless it found something better.
+    """
+
+    name = "milp"
+
+    def __init__(self, time_limit=None):
+        self.time_limit = time_limit
+
+    def solve(self, task, warm_start=None):
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import coo_matrix
+
+        obj, valid, price = _objective(task), task[2], task[3]
+        n_targets, n, price_K = obj.shape
+        best = np.full(n_targets, np.nan)
+        choice = np.zeros((n_targets, n), dtype=np.int64)
+
+        t, i, k = np.nonzero(np.broadcast_to(valid, obj.shape))
+        if price[-1] != price[0]:
+            ## k_i of a target t can neither exceed t nor leave the other products short of it
+            keep = (k <= t) & (k >= t - (price_K - 1) * (n - 1))
+            t, i, k = t[keep], i[keep], k[keep]
+        n_x = len(t)
+        columns = np.arange(n_x)
+        y = n_x + np.arange(n_targets)
+
+        ## one target; per (target, product): sum_k x - y_t = 0; per target: sum k * x - t * y_t = 0
+        rows = [np.zeros(n_targets, dtype=np.int64),
+                1 + t * n + i, 1 + (np.arange(n_targets)[:, None] * n + np.arange(n)).ravel()]
+        cols = [y, columns, np.repeat(y, n)]
+        vals = [np.ones(n_targets), np.ones(n_x), -np.ones(n_targets * n)]
+        n_rows = 1 + n_targets * n
+        if price[-1] != price[0]:
+            rows += [n_rows + t, n_rows + np.arange(n_targets)]
+            cols += [columns, y]
+            vals += [k.astype(np.float64), -np.arange(n_targets, dtype=np.float64)]
+            n_rows += n_targets
+        lower = np.zeros(n_rows)
+        lower[0] = 1.0
+        upper = lower.copy()
+
+        matrix = coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                            shape=(n_rows, n_x + n_targets)).tocsr()
+        ## HiGHS presolve spends far longer on these models than the solve it saves (about 20x here)
+        options = {"presolve": False}
+        if self.time_limit is not None:
+            options["time_limit"] = self.time_limit
+        result = milp(-np.concatenate([obj[t, i, k], np.zeros(n_targets)]),
+                      integrality=np.ones(n_x + n_targets), bounds=Bounds(0, 1),
+                      constraints=LinearConstraint(matrix, lower, upper), options=options)
+
+        ## (target, objective, price indices): the solver's, or the incumbent when it is better
+        found = []
+        if result.x is not None:
+            chosen = result.x[:n_x] > 0.5
+            target = int(np.argmax(result.x[n_x:]))
+            indices = np.zeros(n, dtype=np.int64)
+            indices[i[chosen]] = k[chosen]
+            found.append((target, obj[target, np.arange(n), indices].sum(), indices))
+        incumbent = _warm_target(obj, valid, warm_start)
+        if incumbent is not None:
+            found.append((*incumbent, np.asarray(warm_start)))
+        if found:
+            target, value, indices = max(found, key=lambda solution: solution[1])
+            best[target], choice[target] = value, indices
+        return best, choice
+
+
+class GurobiBackend:
+    """One Gurobi integer program per price_sum target, the warm start as MIP start where it fits."""
+
+    name = "gurobi"
+
+    def solve(self, task, warm_start=None):
+        import gurobipy as gp
+
+        obj, valid, price, price_sum = _objective(task), task[2], task[3], task[4]
+        n_targets, n, price_K = obj.shape
+        best = np.full(n_targets, np.nan)
+        choice = np.zeros((n_targets, n), dtype=np.int64)
+        for t in range(n_targets):
+            model = gp.Model()
+            model.setParam("OutputFlag", 0)
+            x = model.addVars(n, price_K, vtype=gp.GRB.BINARY)
+            model.setObjective(gp.quicksum(obj[t, i, k] * x[i, k] for i in range(n) for k in range(price_K)),
+                               gp.GRB.MAXIMIZE)
+            for i in range(n):
+                model.addConstr(x.sum(i, "*") == 1)
+            model.addConstr(gp.quicksum(price[k] * x[i, k] for i in range(n) for k in range(price_K)) == price_sum[t])
+            model.addConstr(gp.quicksum(x[i, k] for i, k in zip(*np.nonzero(~valid))) == 0)
+            if warm_start is not None:
+                for i in range(n):
+                    for k in range(price_K):
+                        x[i, k].Start = float(warm_start[i] == k)
+            model.optimize()
+            if model.Status == gp.GRB.OPTIMAL:
+                for i in range(n):
+                    choice[t, i] = max(range(price_K), key=lambda k: x[i, k].X)
+                best[t] = model.objVal
+            model.dispose()
+        return best, choice
+
+
+BACKENDS = {backend.name: backend for backend in (DPBackend, MILPBackend, GurobiBackend)}
+
+
+def _solve_task(backend, task_and_warm_start):
+    task, warm_start = task_and_warm_start
+    return backend.solve(task, warm_start)
+
+
+def solve_groups(tasks, backend="dp", warm_starts=None, max_workers=1):
+    """[(best, choice) per task] in task order.
+
+    backend is a BACKENDS name or instance, warm_starts an optional iterable
+    of per-task warm starts; max_workers > 1 (None: all cores) uses a process pool.
+    """
+    backend = BACKENDS[backend]() if isinstance(backend, str) else backend
+    tasks = list(tasks)
+    work = list(zip(tasks, [None] * len(tasks) if warm_starts is None else warm_starts))
+    solve = partial(_solve_task, backend)
+    workers = os.cpu_count() if max_workers is None else max_workers
+    if workers <= 1 or len(tasks) <= 1:
+        return [solve(item) for item in work]
+    ## a few chunks per worker: small groups share a round trip, large ones still balance
+    chunksize = max(1, len(tasks) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(solve, work, chunksize=chunksize))
@@ -0,0 +1,97 @@
+##################################################
+# As-of price lookup over pc_store*.json price changes
+##################################################
+#
+# A price change dated D holds for its (store, product) until the next
+# change. PriceTimeline keeps every change sorted by (store, product,
+# effective date) in flat NumPy arrays; an as-of lookup is then a single
+# searchsorted over a composite (key, day) array, O(log n) per query, so
+# joining weekly sales to millions of price events costs O(n log n).
+
+import numpy as np
+import pandas as pd
+
+
+_DAY_BITS = 32
+
+
+def _to_days(dates):
+    """Dates / strings / timestamps -> int64 days since the epoch."""
+    return np.asarray(
+        pd.to_datetime(np.asarray(dates)).values.astype("datetime64[D]").astype(np.int64)
+    )
+
+
+class PriceTimeline:
+
+    def __init__(self, store_ids, product_ids, dates, prices):
+        """Build from parallel arrays of price events (in any order).
+
+        Several events for one (store, product) on the same day resolve to
+        the last one in input order.
+        """
+        store_ids = np.asarray(store_ids, dtype=np.int64)
+        product_ids = np.asarray(product_ids).astype(str)
+        days = _to_days(dates)
+        prices = np.asarray(prices, dtype=np.float64)
+
+        key_codes, self.keys = pd.MultiIndex.from_arrays(
+            [store_ids, product_ids], names=["store_id", "product_id"]
+        ).factorize()
+
+        order = np.lexsort((days, key_codes))
+        self.key_codes = key_codes[order].astype(np.int64)
+        self.days = days[order]
+        self.prices = prices[order]
+        self._day0 = self.days.min() if len(self.days) else 0
+        self._composite = (self.key_codes << _DAY_BITS) + (self.days - self._day0)
+
+    @classmethod
+    def from_price_changes(cls, df_price):
+        """From the flat frame read_price_log(s) produce (store_id, product_id, PriceDate, price)."""
+        return cls(df_price["store_id"], df_price["product_id"], df_price["PriceDate"], df_price["price"])
+
+    def __len__(self):
+        return len(self.prices)
+
+    def positions(self, store_ids, product_ids, dates):
+        """Index of the event in effect on each date, -1 where there is none."""
+        store_ids = np.asarray(store_ids, dtype=np.int64)
+        product_ids = np.asarray(product_ids).astype(str)
+        days = _to_days(dates)
+        if not len(self.prices):
+            return np.full(len(days), -1, dtype=np.int64)
+
+        codes = self.keys.get_indexer(pd.MultiIndex.from_arrays([store_ids, product_ids]))
+        ## dates before the first event clip to -1 and can never match a key
+        offset = np.maximum(days - self._day0, -1)
+        query = (codes.astype(np.int64) << _DAY_BITS) + offset
+        pos = np.searchsorted(self._composite, query, side="right") - 1
+        found = (codes >= 0) & (pos >= 0)
+        found[found] &= self.key_codes[pos[found]] == codes[found]
+        return np.where(found, pos, -1)
+
+    def asof(self, store_ids, product_ids, dates):
+        """(price, effective date) in effect on each date; NaN / NaT where unknown."""
+        pos = self.positions(store_ids, product_ids, dates)
+        hit = pos >= 0
+        prices = np.full(len(pos), np.nan)
+        prices[hit] = self.prices[pos[hit]]
+        effective = np.full(len(pos), np.datetime64("NaT"), dtype="datetime64[D]")
+        effective[hit] = self.days[pos[hit]].astype("datetime64[D]")
+        return prices, effective
+
+    def save(self, path):
+        """Persist as .npz so the optimizer can reuse it without re-reading the logs."""
+        np.savez(
+            path,
+            store_ids=self.keys.get_level_values(0).to_numpy().astype(np.int64)[self.key_codes],
+            product_ids=self.keys.get_level_values(1).to_numpy().astype(str)[self.key_codes],
+            days=self.days.astype("datetime64[D]"),
+            prices=self.prices,
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["store_ids"], data["product_ids"], data["days"], data["prices"])
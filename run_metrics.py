@@ -0,0 +1,139 @@
+##################################################
+# Per-step run instrumentation
+##################################################
+#
+# RunMetrics times the steps of a pipeline run and appends one JSON record
+# per run to a .jsonl file:
+#
+#   {"run_at": .., "script": .., "seconds": .., "peak_rss_mb": ..,
+#    "steps": [{"step": "fit", "seconds": .., "cpu_seconds": .., "child_cpu_seconds": ..,
+#               "peak_rss_mb": .., "child_peak_rss_mb": ..,
+#               "rows_in": .., "bytes_in": .., "rows_out": .., "bytes_out": ..}, ..]}
+#
+# Usage in a script:
+#
+#   run = RunMetrics("train")
+#   run.start("read_sales")
+#   ...
+#   run.stop(rows_out=len(df_sales), bytes_out=frame_bytes(df_sales))
+#   run.write(path)
+#
+# Peak RSS is per step on Linux, where the high-water mark can be reset
+# through /proc/self/clear_refs; elsewhere it is the process peak so far.
+#
+# Work done in worker processes (process pools) is counted from the
+# resource usage of reaped children: cpu_seconds includes their CPU time
+# (child_cpu_seconds on its own), and steps that ran children record
+# child_peak_rss_mb, the peak of the largest child reaped so far (the OS
+# does not reset it between steps).
+# Both are unavailable where the resource module is missing (Windows).
+
+import os
+import sys
+import json
+import time
+from datetime import datetime
+
+from append_log import append_line
+
+
+def _read_hwm_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rusage_mb(usage):
+    ## kilobytes on Linux, bytes on macOS
+    return usage.ru_maxrss / 2**20 if sys.platform == "darwin" else usage.ru_maxrss / 2**10
+
+
+def children_usage():
+    """(CPU seconds, peak RSS in MB) of the reaped child processes, (0.0, None) without resource."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0, None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, _rusage_mb(usage)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (since the last reset on Linux)."""
+    hwm = _read_hwm_mb()
+    if hwm is not None:
+        return hwm
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    return _rusage_mb(resource.getrusage(resource.RUSAGE_SELF))
+
+
+def frame_bytes(obj):
+    """In-memory size of a DataFrame / Series / ndarray (shallow for object columns)."""
+    if hasattr(obj, "memory_usage"):
+        usage = obj.memory_usage(index=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    return int(getattr(obj, "nbytes", 0))
+
+
+class RunMetrics:
+
+    def __init__(self, script, **context):
+        self.record = {
+            "run_at": datetime.now().isoformat(timespec="seconds"),
+            "script": script, **context, "steps": [],
+        }
+        self._run_start = time.perf_counter()
+        self._step = None
+        self._process_peak = 0.0
+
+    def start(self, name, **volumes):
+        """Begin step name (ending the current one); volumes are rows_in / bytes_in etc."""
+        if self._step is not None:
+            self.stop()
+        _reset_hwm()
+        self._step = {"step": name, **volumes, "_start": time.perf_counter(),
+                      "_cpu": time.process_time(), "_child_cpu": children_usage()[0]}
+
+    def stop(self, **volumes):
+        """End the current step; volumes are rows_out / bytes_out etc."""
+        step, self._step = self._step, None
+        if step is None:
+            return
+        peak = peak_rss_mb()
+        child_cpu, child_peak = children_usage()
+        self._process_peak = max(self._process_peak, peak, child_peak or 0.0)
+        step.update(volumes)
+        step["seconds"] = time.perf_counter() - step.pop("_start")
+        step["child_cpu_seconds"] = child_cpu - step.pop("_child_cpu")
+        step["cpu_seconds"] = time.process_time() - step.pop("_cpu") + step["child_cpu_seconds"]
+        step["peak_rss_mb"] = peak
+        ## only meaningful for steps that ran children themselves
+        step["child_peak_rss_mb"] = child_peak if step["child_cpu_seconds"] > 0 else None
+        self.record["steps"].append(step)
+
+    def write(self, path, **extra):
+        """End the current step and append the run record to the JSON Lines file path."""
+        self.stop()
+        record = dict(self.record, **extra)
+        record["seconds"] = time.perf_counter() - self._run_start
+        record["peak_rss_mb"] = self._process_peak
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        append_line(path, json.dumps(record, default=str))
+        return record
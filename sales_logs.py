@@ -0,0 +1,308 @@
+##################################################
+# Readers for the raw sales_store*.json transaction logs
+##################################################
+#
+# The logs look like
+#
+#   {"SalesLogDateTime": ..., "StoreID": 1,
+#    "Transactions": [{"Products": [{"Price": .., "ProductID": ..}, ..],
+#                      "TransactionDateTime": .., ..}, ..]}
+#
+# iter_sales_log() walks that structure incrementally, decoding one
+# transaction at a time, so memory stays bounded by the largest single
+# transaction instead of the size of the log.
+
+import os
+import re
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+_decoder = json.JSONDecoder()
+_store_in_name = re.compile(r"store(\d+)_")
+_log_name = re.compile(
+    r"^(?P<kind>sales|pc)_store(?P<store>\d+)_(?P<stamp>\d{4}(?:_\d{2}){5})\.json$"
+)
+
+
+def store_id_from_name(path):
+    """Return the store id encoded in a log file name (sales_store1_... -> 1)."""
+    match = _store_in_name.search(os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def discover_logs(data_dir, kind, start_date, end_date, stores=None):
+    """List ``kind`` ("sales" or "pc") logs in data_dir that fall in the window.
+
+    Returns sorted (path, store_id, stamp) tuples. A sales log is stamped at
+    the midnight closing its trading day (sales_store1_2019_01_02_00_00_00
+    holds 2019-01-01), so it is kept when that trading day lies in
+    [start_date, end_date]; price-change logs are kept by their own date.
+    """
+    found = []
+    for name in os.listdir(data_dir):
+        match = _log_name.match(name)
+        if not match or match.group("kind") != kind:
+            continue
+        store_id = int(match.group("store"))
+        if stores is not None and store_id not in stores:
+            continue
+        stamp = datetime.strptime(match.group("stamp"), "%Y_%m_%d_%H_%M_%S")
+        day = (stamp - timedelta(days=1)).date() if kind == "sales" else stamp.date()
+        if start_date <= day <= end_date:
+            found.append((os.path.join(data_dir, name), store_id, stamp))
+    return sorted(found, key=lambda f: (f[2], f[1]))
+
+
+class _JsonStream:
+    """Minimal pull parser on top of json.JSONDecoder.raw_decode.
+
+    Containers we want to walk (the top-level object, the Transactions
+    array) are tokenised by hand; everything else is handed to raw_decode
+    as a whole value.
+    """
+
+    def __init__(self, fp, chunk_size):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        ## drop the consumed prefix so the buffer does not grow with the file
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buf += chunk
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} in JSON stream, found {found!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                ## a value inside a container is always followed by , ] or },
+                ## so ending exactly at the buffer edge means it may be truncated
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+    def object_keys(self):
+        """Yield the keys of the object at the cursor; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def array_items(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("]")
+            return
+
+
+def iter_sales_log(path, chunk_size=1 << 16):
+    """Yield (store_id, transaction_datetime, product_id, price) per sold item.
+
+    Transactions are decoded one by one. If the log's StoreID appears after
+    the Transactions array the store id is taken from the file name.
+    """
+    with open(path, encoding="utf-8") as fp:
+        stream = _JsonStream(fp, chunk_size)
+        store_id = None
+        for key in stream.object_keys():
+            if key != "Transactions":
+                value = stream.value()
+                if key == "StoreID":
+                    store_id = value
+                continue
+            if store_id is None:
+                store_id = store_id_from_name(path)
+            for transaction in stream.array_items():
+                transaction_time = transaction["TransactionDateTime"]
+                for product in transaction["Products"]:
+                    yield store_id, transaction_time, product["ProductID"], product["Price"]
+
+
+def read_price_log(path):
+    """Read one pc_store*.json price-change log into a flat frame."""
+    df_price = pd.read_json(path)
+
+    price_updates = pd.json_normalize(df_price["PriceUpdates"])
+    df_price = df_price.drop("PriceUpdates", axis=1).join(price_updates)
+
+    df_price["week_start"] = pd.to_datetime(df_price["PriceDate"]).dt.date
+
+    return df_price.rename(
+        columns={
+            "ProductID": "product_id",
+            "StoreID": "store_id",
+            "Price": "price",
+        }
+    )
+
+
+def read_price_logs(paths):
+    """Concatenate several price-change logs (empty frame if there are none)."""
+    frames = [read_price_log(path) for path in paths]
+    if not frames:
+        return pd.DataFrame(
+            columns=["PriceDate", "store_id", "price", "product_id", "week_start"]
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def flatten_sales_log(path):
+    """Load a whole sales log into one flat frame, one row per sold item.
+
+    Products are gathered into flat column lists in a single pass; the
+    per-transaction store id and timestamp are broadcast with np.repeat over
+    the per-transaction product counts instead of building a frame per
+    transaction.
+    """
+    with open(path, encoding="utf-8") as fp:
+        log = json.load(fp)
+    transactions = log["Transactions"]
+    store_id = log.get("StoreID", store_id_from_name(path))
+
+    counts = np.fromiter(
+        (len(t["Products"]) for t in transactions), dtype=np.int64, count=len(transactions)
+    )
+    product_ids = [p["ProductID"] for t in transactions for p in t["Products"]]
+    prices = [p["Price"] for t in transactions for p in t["Products"]]
+    times = pd.to_datetime([t["TransactionDateTime"] for t in transactions])
+
+    return pd.DataFrame({
+        "product_id": pd.Categorical(product_ids),
+        "price": np.asarray(prices, dtype=np.float64),
+        "store_id": np.full(len(product_ids), store_id),
+        "date_date": np.repeat(times.values, counts),
+    })
+
+
+def week_start_of(day, anchor):
+    """Start of the 7-day bucket containing ``day``, counting weeks from ``anchor``."""
+    return anchor + timedelta(days=7 * ((day - anchor).days // 7))
+
+
+def week_starts(timestamps, anchor):
+    """Vectorised week_start_of over a datetime Series; returns dates."""
+    anchor = pd.Timestamp(anchor)
+    days = (timestamps.dt.normalize() - anchor).dt.days
+    return (anchor + pd.to_timedelta(7 * (days // 7), unit="D")).dt.date
+
+
+class WeeklySalesCounter:
+    """Unit sales per (week_start, store_id, product_id).
+
+    Memory grows with the number of distinct keys only; timestamps are
+    bucketed by calendar day and the day -> week lookup is cached.
+    """
+
+    def __init__(self, anchor):
+        self.anchor = anchor
+        self.counts = Counter()
+        self._weeks = {}
+
+    def week_start(self, transaction_time):
+        day = transaction_time[:10]
+        week = self._weeks.get(day)
+        if week is None:
+            week = week_start_of(datetime.strptime(day, "%Y-%m-%d").date(), self.anchor)
+            self._weeks[day] = week
+        return week
+
+    def add(self, store_id, transaction_time, product_id, price=None):
+        self.counts[(self.week_start(transaction_time), store_id, product_id)] += 1
+
+    def update(self, rows):
+        for store_id, transaction_time, product_id, price in rows:
+            self.add(store_id, transaction_time, product_id, price)
+        return self
+
+    def merge(self, counts):
+        """Fold in partial counts from another counter (associative reduce)."""
+        self.counts.update(counts)
+        return self
+
+    def to_frame(self):
+        keys = sorted(self.counts)
+        return pd.DataFrame(
+            [key + (self.counts[key],) for key in keys],
+            columns=["week_start", "store_id", "product_id", "sales"],
+        )
+
+
+##################################################
+# Parallel ingestion of many logs
+##################################################
+
+def count_sales_log(path, anchor):
+    """Partial aggregate of one log: Counter of (week_start, store, product) -> sales."""
+    return WeeklySalesCounter(anchor).update(iter_sales_log(path)).counts
+
+
+def count_sales_logs(paths, anchor, max_workers=None):
+    """Count many logs in a process pool and reduce the partial counts.
+
+    Each worker streams one log and returns only its per-key Counter, so
+    what crosses the process boundary is proportional to the keys in that
+    log, not its transactions. Counters are merged in submission order,
+    which keeps the result independent of completion order.
+    """
+    counter = WeeklySalesCounter(anchor)
+    paths = list(paths)
+    if max_workers == 1 or len(paths) <= 1:
+        for path in paths:
+            counter.merge(count_sales_log(path, anchor))
+        return counter
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for partial in pool.map(count_sales_log, paths, [anchor] * len(paths)):
+            counter.merge(partial)
+    return counter
@@ -0,0 +1,108 @@
+##################################################
+# Partitioned columnar store for aggregated sales
+##################################################
+#
+# Layout (hive-style, one Parquet file per partition):
+#
+#   <root>/week_start=2019-01-01/store_id=1/part-0.parquet
+#
+# String and categorical columns (product_id, ProductID, group_val, ...) are
+# written as Arrow dictionary columns, and every column gets Parquet
+# dictionary pages, so the product/store attributes repeated on each row
+# cost a small code per row instead of the full value.
+#
+# Readers ask for the weeks, stores and columns they need: week/store
+# filters prune whole partition directories, other predicates are pushed
+# down to the Parquet row-group statistics, and only projected columns are
+# decoded. Needs pyarrow.
+
+import os
+
+import pandas as pd
+
+
+PARTITION_COLS = ["week_start", "store_id"]
+
+
+def _arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise ImportError(
+            "the columnar sales store needs pyarrow (pip install pyarrow)"
+        ) from e
+    return pa, ds
+
+
+def _partitioning(pa, ds):
+    return ds.partitioning(
+        pa.schema([("week_start", pa.string()), ("store_id", pa.int64())]),
+        flavor="hive",
+    )
+
+
+def write_sales(df, root):
+    """Write df into the store, replacing the (week_start, store_id) partitions it covers."""
+    pa, ds = _arrow()
+    df = df.copy()
+    df["week_start"] = pd.to_datetime(df["week_start"]).dt.strftime("%Y-%m-%d")
+    df["store_id"] = df["store_id"].astype("int64")
+    for col in df.columns:
+        if col not in PARTITION_COLS and (
+            df[col].dtype == object or str(df[col].dtype) in ("category", "str", "string")
+        ):
+            df[col] = df[col].astype(str).astype("category")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=_partitioning(pa, ds),
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="delete_matching",
+    )
+    return root
+
+
+def list_partitions(root):
+    """Sorted (week_start, store_id) pairs present in the store."""
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+    for week_dir in os.listdir(root):
+        if not week_dir.startswith("week_start="):
+            continue
+        for store_dir in os.listdir(os.path.join(root, week_dir)):
+            if store_dir.startswith("store_id="):
+                partitions.append((week_dir.split("=", 1)[1], int(store_dir.split("=", 1)[1])))
+    return sorted(partitions)
+
+
+def read_sales(root, columns=None, weeks=None, stores=None, where=None):
+    """Read aggregated sales back as a DataFrame.
+
+    columns -- columns to decode (None = all); partition columns included on request
+    weeks   -- week_start values (str or date) to keep
+    stores  -- store ids to keep
+    where   -- {column: value or list of values} equality/membership predicates
+    """
+    pa, ds = _arrow()
+    dataset = ds.dataset(root, format="parquet", partitioning=_partitioning(pa, ds))
+
+    predicates = {}
+    if weeks is not None:
+        predicates["week_start"] = [str(w) for w in weeks]
+    if stores is not None:
+        predicates["store_id"] = [int(s) for s in stores]
+    predicates.update(where or {})
+
+    expression = None
+    for col, value in predicates.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        term = ds.field(col).isin(list(values))
+        expression = term if expression is None else expression & term
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    return table.to_pandas()
@@ -0,0 +1,55 @@
+##################################################
+# Columnar collector for optimizer solutions
+##################################################
+#
+# Solvers write each solved (competing group, price_sum) target into
+# pre-sized columns, one entry per product of the group:
+#
+#   group       competing group code
+#   price_sum   the target
+#   objective   optimal profit of the target
+#   row         chosen candidate row (index into the scored candidate grid)
+#
+# A grid with price_K prices per product has at most len(grid) / price_K
+# such entries, so the columns are allocated once up front. best() then
+# picks the best price_sum of every group in linear time and returns the
+# chosen candidate rows, which index straight into the scored grid for the
+# output columns (no merges back onto it).
+
+import numpy as np
+
+
+class SolutionBuffer:
+
+    def __init__(self, capacity):
+        self.group = np.empty(capacity, dtype=np.int64)
+        self.price_sum = np.empty(capacity, dtype=np.float64)
+        self.objective = np.empty(capacity, dtype=np.float64)
+        self.row = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+
+    def add(self, group, price_sum, objective, rows):
+        """Solutions of one group: price_sum[m], objective[m] and the chosen candidate rows[m, n_products]."""
+        rows = np.asarray(rows, dtype=np.int64).reshape(len(price_sum), -1)
+        start, end = self.size, self.size + rows.size
+        if end > len(self.row):
+            raise ValueError(f"SolutionBuffer holds {len(self.row)} entries, {end} needed")
+        n = rows.shape[1]
+        self.group[start:end] = group
+        self.price_sum[start:end] = np.repeat(price_sum, n)
+        self.objective[start:end] = np.repeat(objective, n)
+        self.row[start:end] = rows.ravel()
+        self.size = end
+
+    def best(self):
+        """Chosen candidate rows of the most profitable price_sum of each group (the lowest price_sum on ties)."""
+        group, price_sum, objective = self.group[:self.size], self.price_sum[:self.size], self.objective[:self.size]
+        if not self.size:
+            return self.row[:0]
+        codes, group = np.unique(group, return_inverse=True)
+        best_objective = np.full(len(codes), -np.inf)
+        np.maximum.at(best_objective, group, objective)
+        at_best = objective == best_objective[group]
+        best_sum = np.full(len(codes), np.inf)
+        np.minimum.at(best_sum, group[at_best], price_sum[at_best])
+        return self.row[:self.size][at_best & (price_sum == best_sum[group])]
@@ -0,0 +1,154 @@
+##################################################
+# Synthetic retail data at configurable scale
+##################################################
+#
+# Writes the same files the pipeline reads from "Data Files/":
+#
+#   products.csv, stores.csv, processed_time_df.csv
+#   sales_store<N>_<YYYY_MM_DD_HH_MM_SS>.json   one per store per trading day,
+#                                              stamped at the following midnight
+#   pc_store<N>_<YYYY_MM_DD_HH_MM_SS>.json      one per store per week
+#
+# with the same JSON layout (4-space indent, sorted keys) as the bundled
+# logs. Demand falls with price relative to MSRP, so the trainer and the
+# optimizer have a signal to learn. Usage:
+#
+#   python synthetic_data.py OUT_DIR --stores 20 --products 200 --weeks 8 --transactions 1000
+
+import os
+import json
+import argparse
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+PRICE_ELASTICITY = 2.5
+
+
+def make_products(n_products, rng):
+    n_departments = max(1, -(-n_products // 3))
+    rows = []
+    for d in range(1, n_departments + 1):
+        for b in range(1, 4):
+            if len(rows) == n_products:
+                break
+            msrp = round(float(rng.uniform(5, 30)), 2)
+            cost = round(msrp * float(rng.uniform(0.35, 0.6)), 2)
+            rows.append({"DepartmentID": d, "BrandID": b, "ProductID": f"{d}_{b}", "MSRP": msrp, "Cost": cost})
+    return pd.DataFrame(rows)
+
+
+def make_stores(n_stores, rng):
+    income = rng.normal(50000, 8000, n_stores)
+    traffic = rng.normal(100, 5, n_stores)
+    rand = rng.random(n_stores)
+    df = pd.DataFrame({
+        "StoreID": np.arange(1, n_stores + 1),
+        "AvgHouseholdIncome": income,
+        "AvgTraffic": traffic,
+        "AvgHouseholdIncome_std": (income - income.mean()) / (income.std() or 1),
+        "AvgTraffic_std": (traffic - traffic.mean()) / (traffic.std() or 1),
+        "cluster_val": rng.integers(1, 4, n_stores),
+        "rand": rand,
+    })
+    df["rank"] = df.groupby("cluster_val")["rand"].rank(method="first").astype(int)
+    df["cume_dist"] = df.groupby("cluster_val")["rand"].rank(pct=True, method="max").round(6)
+    df["cume_dist"] = 1 - df["cume_dist"]
+    df["group_val"] = np.where(df["rank"] % 2 == 0, "treatment", "control")
+    return df
+
+
+def _stamp(moment):
+    return moment.strftime("%Y_%m_%d_%H_%M_%S")
+
+
+def _write_json(path, obj):
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=4, sort_keys=True)
+
+
+def generate_dataset(out_dir, n_stores=6, n_products=60, n_weeks=4, transactions_per_day=200,
+                     start_date=date(2019, 1, 1), seed=0):
+    """Write a synthetic dataset to out_dir and return a dict of its sizes."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    df_products = make_products(n_products, rng)
+    df_stores = make_stores(n_stores, rng)
+    df_products.to_csv(os.path.join(out_dir, "products.csv"), index=False)
+    df_stores.to_csv(os.path.join(out_dir, "stores.csv"), index=False)
+    end_date = start_date + timedelta(days=7 * n_weeks - 1)
+    pd.DataFrame({"start_date": [str(start_date)], "end_date": [str(end_date)]}).to_csv(
+        os.path.join(out_dir, "processed_time_df.csv"), index=False)
+
+    product_ids = df_products["ProductID"].to_numpy()
+    msrp = df_products["MSRP"].to_numpy()
+    n_transactions = n_items = 0
+
+    for store_id, traffic in zip(df_stores["StoreID"], df_stores["AvgTraffic"]):
+        for week in range(n_weeks):
+            week_start = datetime.combine(start_date + timedelta(days=7 * week), datetime.min.time())
+            prices = np.round(msrp * rng.uniform(0.7, 1.0, len(msrp)), 2)
+            _write_json(
+                os.path.join(out_dir, f"pc_store{store_id}_{_stamp(week_start)}.json"),
+                {
+                    "PriceDate": str(week_start),
+                    "PriceUpdates": [{"Price": float(p), "ProductID": pid} for pid, p in zip(product_ids, prices)],
+                    "StoreID": int(store_id),
+                },
+            )
+            ## cheaper relative to MSRP -> more likely to be picked
+            weights = (prices / msrp) ** -PRICE_ELASTICITY
+            weights /= weights.sum()
+
+            for day in range(7):
+                day_start = week_start + timedelta(days=day)
+                count = rng.poisson(transactions_per_day * traffic / 100)
+                seconds = np.sort(rng.integers(7 * 3600, 21 * 3600, count))
+                sizes = rng.integers(1, 7, count)
+                picks = rng.choice(len(product_ids), sizes.sum(), p=weights)
+                transactions, offset = [], 0
+                for second, size in zip(seconds, sizes):
+                    chosen = picks[offset:offset + size]
+                    offset += size
+                    subtotal = round(float(prices[chosen].sum()), 2)
+                    tax = round(subtotal * 0.07, 2)
+                    transactions.append({
+                        "Products": [{"Price": float(prices[i]), "ProductID": product_ids[i]} for i in chosen],
+                        "Subtotal": subtotal,
+                        "Tax": tax,
+                        "Total": round(subtotal + tax, 2),
+                        "TransactionDateTime": str(day_start + timedelta(seconds=int(second))),
+                    })
+                log_time = day_start + timedelta(days=1)
+                _write_json(
+                    os.path.join(out_dir, f"sales_store{store_id}_{_stamp(log_time)}.json"),
+                    {"SalesLogDateTime": str(log_time), "StoreID": int(store_id), "Transactions": transactions},
+                )
+                n_transactions += count
+                n_items += int(sizes.sum())
+
+    return {
+        "stores": n_stores, "products": len(df_products), "weeks": n_weeks,
+        "transactions": n_transactions, "items": n_items,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic retail dataset")
+    parser.add_argument("out_dir")
+    parser.add_argument("--stores", type=int, default=6)
+    parser.add_argument("--products", type=int, default=60)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--transactions", type=int, default=200, help="transactions per store per day")
+    parser.add_argument("--start-date", default="2019-01-01")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = generate_dataset(
+        args.out_dir, args.stores, args.products, args.weeks, args.transactions,
+        datetime.strptime(args.start_date, "%Y-%m-%d").date(), args.seed,
+    )
+    print("✅ Synthetic data written to", args.out_dir, sizes)
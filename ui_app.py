@@ -6,6 +6,9 @@ import plotly.express as px
 from sklearn.linear_model import LinearRegression
 import time
 
+from dimensions import Dimensions
+from sales_store import read_sales
+
 # =====================================================
 # PAGE CONFIG
 # =====================================================
@@ -65,21 +68,36 @@ body {
 # LOAD DATA
 # =====================================================
 DATA_DIR = "aggregated_sales_data"
-
-if not os.path.exists(DATA_DIR):
-    st.error("❌ aggregated_sales_data folder not found")
-    st.stop()
-
-files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
-if not files:
-    st.error("❌ No CSV files found")
-    st.stop()
-
-latest_file = sorted(files)[-1]
-
-with st.spinner("Loading retail sales data..."):
-    time.sleep(1)
-    df = pd.read_csv(os.path.join(DATA_DIR, latest_file))
+SALES_STORE_DIR = "sales_store"
+DIMENSIONS_FILE = os.path.join(DATA_DIR, "dimensions.npz")
+
+if os.path.isdir(SALES_STORE_DIR):
+    ## partitioned Parquet store: decode only the fact columns, then gather
+    ## product attributes from the shared dimension dictionary by code
+    with st.spinner("Loading retail sales data..."):
+        df = read_sales(
+            SALES_STORE_DIR,
+            columns=["week_start", "store_id", "product_id", "sales", "price"],
+        )
+        if os.path.exists(DIMENSIONS_FILE):
+            df = Dimensions.load(DIMENSIONS_FILE).attach(
+                df, attrs=["DepartmentID", "BrandID", "MSRP", "Cost"]
+            )
+else:
+    if not os.path.exists(DATA_DIR):
+        st.error("❌ aggregated_sales_data folder not found")
+        st.stop()
+
+    files = [f for f in os.listdir(DATA_DIR) if f.endswith(".csv")]
+    if not files:
+        st.error("❌ No CSV files found")
+        st.stop()
+
+    latest_file = sorted(files)[-1]
+
+    with st.spinner("Loading retail sales data..."):
+        time.sleep(1)
+        df = pd.read_csv(os.path.join(DATA_DIR, latest_file))
 
 required_cols = {"week_start", "store_id", "product_id", "sales"}
 if not required_cols.issubset(df.columns):